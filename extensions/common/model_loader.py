@@ -0,0 +1,90 @@
+"""
+Off-the-start-path model loading shared by TEN extensions
+
+An extension hands ModelLoader its load and warm-up steps. run() executes
+them inline (synchronous start); start() executes them on a background
+thread so on_start can return at once while the extension serves requests
+from its fallback. Either way the loader records when the model became
+ready, how long loading and warm-up took, and why it failed.
+"""
+
+import threading
+import time
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """Load, then warm up, a model and report readiness"""
+    
+    def __init__(self, name: str, load: Callable[[], None], warm_up: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.load = load
+        self.warm_up = warm_up
+        self.ready_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        
+        self.state = "pending"  # pending, loading, warming_up, ready or failed
+        self.error: Optional[str] = None
+        self.started_at = 0.0
+        self.ready_at = 0.0
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+        
+    @property
+    def ready(self) -> bool:
+        return self.ready_event.is_set()
+        
+    def start(self) -> None:
+        """Load on a background thread"""
+        self.thread = threading.Thread(target=self.run, name=f"{self.name}-loader", daemon=True)
+        self.thread.start()
+        
+    def run(self) -> bool:
+        """Load and warm up on the calling thread, returns True once the model is ready"""
+        self.started_at = time.time()
+        self.state = "loading"
+        try:
+            self.load()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            self.load_time = time.time() - self.started_at
+            logger.warning(f"{self.name}: model load failed after {self.load_time:.2f}s: {e}")
+            return False
+        self.load_time = time.time() - self.started_at
+        
+        if self.warm_up:
+            self.state = "warming_up"
+            warmup_start = time.time()
+            try:
+                self.warm_up()
+            except Exception as e:
+                # A cold model still works, only the first request pays for it
+                logger.warning(f"{self.name}: warm-up failed: {e}")
+            self.warmup_time = time.time() - warmup_start
+            
+        self.state = "ready"
+        self.ready_at = time.time()
+        self.ready_event.set()
+        logger.info(f"{self.name}: model ready (load {self.load_time:.2f}s, warm-up {self.warmup_time:.2f}s)")
+        return True
+        
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the model is ready, False on timeout"""
+        return self.ready_event.wait(timeout)
+        
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+            
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "load_time": round(self.load_time, 3),
+            "warmup_time": round(self.warmup_time, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,128 @@
+"""
+Process-wide model registry shared by TEN extensions
+
+Extensions acquire models by key (kind, model name, engine, dtype) instead of
+loading them in on_start. Sessions asking for the same key share one set of
+weights; concurrent first requests wait for a single load. When the last
+session releases a model it stays loaded for an idle TTL so the next session
+starts instantly.
+"""
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A loaded (or loading) model and its reference count"""
+    
+    def __init__(self, idle_ttl: float):
+        self.model = None
+        self.error: Optional[Exception] = None
+        self.loaded = threading.Event()
+        self.refcount = 0
+        self.idle_ttl = idle_ttl
+        self.released_at = 0.0
+        self.load_time = 0.0
+        self.timer: Optional[threading.Timer] = None
+
+
+class ModelRegistry:
+    """Reference-counted model cache with idle expiry"""
+    
+    def __init__(self, idle_ttl: float = 300.0):
+        self.idle_ttl = idle_ttl
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        
+    def acquire(self, key: Hashable, loader: Callable[[], Any], idle_ttl: Optional[float] = None) -> Any:
+        """Return the model for `key`, loading it with `loader` if needed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = _Entry(self.idle_ttl if idle_ttl is None else idle_ttl)
+                self._entries[key] = entry
+                self.loads += 1
+            else:
+                self.hits += 1
+                if idle_ttl is not None:
+                    entry.idle_ttl = max(entry.idle_ttl, idle_ttl)
+            entry.refcount += 1
+            if entry.timer:
+                entry.timer.cancel()
+                entry.timer = None
+                
+        if owner:
+            start_time = time.time()
+            try:
+                entry.model = loader()
+                entry.load_time = time.time() - start_time
+                logger.info(f"Model registry: loaded {key} in {entry.load_time:.2f}s")
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(key, None)
+            finally:
+                entry.loaded.set()
+        else:
+            entry.loaded.wait()
+            
+        if entry.error is not None:
+            raise entry.error
+        return entry.model
+        
+    def release(self, key: Hashable) -> None:
+        """Drop one reference, the model is unloaded after its idle TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                return
+                
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+                
+            entry.released_at = time.time()
+            if entry.idle_ttl <= 0:
+                self._evict(key, entry)
+            else:
+                entry.timer = threading.Timer(entry.idle_ttl, self._expire, args=(key, entry))
+                entry.timer.daemon = True
+                entry.timer.start()
+                
+    def _expire(self, key: Hashable, entry: _Entry) -> None:
+        """Timer callback, evicts the model if nobody re-acquired it"""
+        with self._lock:
+            if self._entries.get(key) is entry and entry.refcount == 0:
+                self._evict(key, entry)
+                
+    def _evict(self, key: Hashable, entry: _Entry) -> None:
+        """Remove an entry, caller holds the lock"""
+        del self._entries[key]
+        entry.model = None
+        self.evictions += 1
+        logger.info(f"Model registry: unloaded {key}")
+        
+    def stats(self) -> dict:
+        """Loaded models with their reference counts"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "models": {
+                    str(key): {"refcount": entry.refcount, "load_time": round(entry.load_time, 3)}
+                    for key, entry in self._entries.items()
+                },
+            }
+
+
+# Shared by every extension loaded in this process
+model_registry = ModelRegistry()
\ No newline at end of file
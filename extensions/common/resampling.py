@@ -0,0 +1,106 @@
+"""
+Band-limited sample rate conversion shared by TEN extensions
+
+Polyphase resampling with a Kaiser-windowed sinc low-pass, so content above
+the new Nyquist frequency is removed instead of aliased. resample() converts
+a whole signal at once; StreamingResampler converts a stream frame by frame,
+carrying the filter history and the output phase across calls so the result
+(and its sample clock) is the same as converting the stream in one piece.
+"""
+
+import math
+import numpy as np
+
+
+def design_filter(up: int, down: int, zero_crossings: int = 16) -> tuple:
+    """Polyphase filter bank for an up/down ratio, returns (phases, half_length)
+    
+    phases[p] holds the prototype taps p, p + up, p + 2 * up, ... so output n
+    is the dot product of phases[(n * down + half_length) % up] with the
+    input samples ending at (n * down + half_length) // up, newest first.
+    """
+    factor = max(up, down)
+    half_length = zero_crossings * factor
+    cutoff = 0.475 / factor  # cycles per upsampled sample, slightly below the lower Nyquist
+    taps = np.arange(-half_length, half_length + 1, dtype=np.float64)
+    prototype = 2 * cutoff * up * np.sinc(2 * cutoff * taps) * np.kaiser(len(taps), 8.6)
+    
+    width = -(-len(prototype) // up)
+    prototype = np.concatenate([prototype, np.zeros(width * up - len(prototype))])
+    return prototype.reshape(width, up).T.astype(np.float32), half_length
+
+
+def _apply(samples: np.ndarray, first_index: int, phases: np.ndarray, up: int, down: int, half_length: int,
+           begin: int, end: int, chunk_size: int = 1 << 16) -> np.ndarray:
+    """Outputs begin..end-1, `samples` holds the input from absolute index `first_index` on"""
+    width = phases.shape[1]
+    offsets = np.arange(width)
+    out = np.empty(max(0, end - begin), dtype=np.float32)
+    for chunk_begin in range(begin, end, chunk_size):
+        position = np.arange(chunk_begin, min(chunk_begin + chunk_size, end), dtype=np.int64) * down + half_length
+        base, phase = position // up, position % up
+        windows = samples[(base - first_index)[:, None] - offsets]
+        out[chunk_begin - begin:chunk_begin - begin + len(position)] = np.einsum("ij,ij->i", windows, phases[phase])
+    return out
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int, zero_crossings: int = 16) -> np.ndarray:
+    """Resample a whole signal to float32"""
+    if source_rate == target_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+        
+    g = math.gcd(int(source_rate), int(target_rate))
+    up, down = int(target_rate) // g, int(source_rate) // g
+    phases, half_length = design_filter(up, down, zero_crossings)
+    width = phases.shape[1]
+    
+    # Zeros on both sides stand in for the signal outside the clip
+    samples = np.concatenate([
+        np.zeros(width, dtype=np.float32),
+        audio.astype(np.float32, copy=False),
+        np.zeros(width, dtype=np.float32)
+    ])
+    target_length = int(round(len(audio) * target_rate / source_rate))
+    return _apply(samples, -width, phases, up, down, half_length, 0, target_length)
+
+
+class StreamingResampler:
+    """Frame-by-frame resample(), with the same output and sample clock
+    
+    Output sample n is centred on input time n / target_rate, so an output
+    is only produced once the input it needs has arrived: results lag the
+    input by half the filter (about a millisecond) but are never shifted.
+    """
+    
+    def __init__(self, source_rate: int, target_rate: int, zero_crossings: int = 16):
+        self.source_rate = int(source_rate)
+        self.target_rate = int(target_rate)
+        g = math.gcd(self.source_rate, self.target_rate)
+        self.up, self.down = self.target_rate // g, self.source_rate // g
+        self.phases, self.half_length = design_filter(self.up, self.down, zero_crossings)
+        self.width = self.phases.shape[1]
+        self.reset()
+        
+    def reset(self) -> None:
+        self.history = np.zeros(self.width, dtype=np.float32)  # silence before the stream
+        self.history_start = -self.width  # absolute input index of history[0]
+        self.produced = 0  # outputs emitted so far
+        
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Feed input samples, returns every float32 output they complete"""
+        samples = np.concatenate((self.history, audio.astype(np.float32, copy=False)))
+        received = self.history_start + len(samples)
+        
+        # Output n needs input up to (n * down + half_length) // up
+        ready = received * self.up - self.half_length - 1
+        end = max(self.produced, ready // self.down + 1 if ready >= 0 else 0)
+        out = _apply(samples, self.history_start, self.phases, self.up, self.down, self.half_length,
+                     self.produced, end)
+        self.produced = end
+        
+        # Keep the oldest input the next output still reads
+        keep_from = (end * self.down + self.half_length) // self.up - self.width + 1
+        drop = max(0, min(keep_from, received) - self.history_start)
+        self.history = samples[drop:]
+        self.history_start += drop
+        return out
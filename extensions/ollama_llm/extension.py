@@ -2,15 +2,46 @@
 Ollama LLM Extension for TEN Framework
 """
 
-from ten import Extension, TenEnv, Data
+from ten import Extension, TenEnv, Data, Cmd, CmdResult, StatusCode
 import aiohttp
 import asyncio
 import json
 import logging
+import re
+import time
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
+def normalize_text(text: str) -> str:
+    """Compare transcripts without case, punctuation or spacing differences"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class SpeculativeRequest:
+    """A chat request started on a likely-finished partial transcript
+    
+    The response is streamed into a buffer and only reaches TTS if the final
+    text matches; otherwise the request is cancelled and its tokens wasted.
+    """
+    
+    def __init__(self, text: str, history_length: int):
+        self.text = text
+        self.key = normalize_text(text)
+        self.history_length = history_length  # the history it was built on
+        self.started_at = time.time()
+        self.chunks = []
+        self.tokens = 0
+        self.done = False
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        
+    @property
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+
 class OllamaLLMExtension(Extension):
     """Ollama Language Model extension"""
     
@@ -21,6 +52,21 @@ class OllamaLLMExtension(Extension):
         self.conversation_history = []
         self.session = None
         
+        # Speculative prefetch on turn_result, committed when the final text matches
+        self.speculative = False
+        self.speculative_min_confidence = 0.8
+        self.speculation: Optional[SpeculativeRequest] = None
+        self.answered_key = ""  # normalized final text of the last user turn
+        self.speculation_stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "cancelled": 0,
+            "used_tokens": 0,
+            "wasted_tokens": 0,
+            "head_start_total": 0.0,
+        }
+        
     def on_configure(self, ten_env: TenEnv) -> None:
         """Configure extension"""
         try:
@@ -28,6 +74,9 @@ class OllamaLLMExtension(Extension):
             self.model = ten_env.get_property_string("model") or self.model
             self.temperature = ten_env.get_property_float("temperature") or 0.7
             self.ctx_size = ten_env.get_property_int("ctx_size") or 4096
+            self.speculative = ten_env.get_property_bool("speculative") or False
+            min_confidence = ten_env.get_property_float("speculative_min_confidence")
+            self.speculative_min_confidence = 0.8 if min_confidence is None else min_confidence
             
             ten_env.on_configure_done()
         except Exception as e:
@@ -48,6 +97,7 @@ class OllamaLLMExtension(Extension):
         
     def on_stop(self, ten_env: TenEnv) -> None:
         """Stop extension"""
+        self._cancel_speculation("extension stopped")
         if self.session:
             asyncio.create_task(self.session.close())
         ten_env.on_stop_done()
@@ -61,15 +111,148 @@ class OllamaLLMExtension(Extension):
                 
                 if user_text:
                     logger.info(f"User: {user_text}")
+                    self.answered_key = normalize_text(user_text)
                     
+                    speculation, self.speculation = self.speculation, None
+                    if speculation and self._speculation_matches(speculation, user_text):
+                        # Already generating (or generated) for this text
+                        asyncio.create_task(
+                            self._commit_speculation(ten_env, speculation, user_text)
+                        )
+                        return
+                        
+                    if speculation:
+                        self._discard_speculation(speculation, "misses", "final text differs")
+                        
                     # Process with Ollama
                     asyncio.create_task(
                         self._process_with_ollama(ten_env, user_text)
                     )
                     
+            elif data.get_name() == "turn_result" and self.speculative:
+                self._on_turn_result(
+                    data.get_property_string("state"),
+                    data.get_property_float("confidence"),
+                    data.get_property_string("text")
+                )
+                
+            elif data.get_name() == "vad_result" and self.speculative:
+                if data.get_property_bool("is_speech"):
+                    self._cancel_speculation("user kept talking")
+                    
         except Exception as e:
             logger.error(f"Error handling data: {e}")
             
+    def _on_turn_result(self, state: str, confidence: float, text: str) -> None:
+        """Start a speculative request on a likely-finished transcript, cancel it otherwise"""
+        # The final text usually arrives before its own verdict, that turn is already answered
+        key = normalize_text(text or "")
+        if key and key == self.answered_key:
+            return
+            
+        if state != "finished" or (confidence or 0.0) < self.speculative_min_confidence or not key:
+            self._cancel_speculation("turn not finished")
+            return
+            
+        if self.speculation and self.speculation.key == key:
+            return
+            
+        self._cancel_speculation("transcript changed")
+        speculation = SpeculativeRequest(text, len(self.conversation_history))
+        speculation.task = asyncio.create_task(self._speculate(speculation))
+        self.speculation = speculation
+        self.speculation_stats["started"] += 1
+        logger.debug(f"Speculating on: {text}")
+        
+    def _speculation_matches(self, speculation: SpeculativeRequest, user_text: str) -> bool:
+        return (speculation.key == normalize_text(user_text) and
+                speculation.history_length == len(self.conversation_history))
+                
+    def _cancel_speculation(self, reason: str) -> None:
+        speculation, self.speculation = self.speculation, None
+        if speculation:
+            self._discard_speculation(speculation, "cancelled", reason)
+            
+    def _discard_speculation(self, speculation: SpeculativeRequest, outcome: str, reason: str) -> None:
+        """Abort the HTTP request and book its tokens as wasted"""
+        if speculation.task and not speculation.task.done():
+            speculation.task.cancel()
+        self.speculation_stats[outcome] += 1
+        self.speculation_stats["wasted_tokens"] += speculation.tokens
+        logger.debug(f"Speculation dropped ({reason}), {speculation.tokens} tokens wasted")
+        
+    def _chat_payload(self, messages: list, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": self.temperature,
+                "num_ctx": self.ctx_size
+            }
+        }
+        
+    async def _speculate(self, speculation: SpeculativeRequest) -> None:
+        """Stream a response into the speculation buffer, nothing is sent"""
+        try:
+            if not self.session:
+                self.session = aiohttp.ClientSession()
+                
+            messages = self.conversation_history + [{"role": "user", "content": speculation.text}]
+            async with self.session.post(
+                f"{self.base_url}/api/chat",
+                json=self._chat_payload(messages, stream=True)
+            ) as response:
+                if response.status != 200:
+                    speculation.error = f"Ollama API error: {response.status}"
+                    return
+                    
+                # One JSON object per line, usually one token each
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get("message", {}).get("content", "")
+                    if content:
+                        speculation.chunks.append(content)
+                        speculation.tokens += 1
+                    if chunk.get("done"):
+                        speculation.tokens = chunk.get("eval_count", speculation.tokens)
+                        break
+                        
+            speculation.done = True
+            
+        except asyncio.CancelledError:
+            # Leaving the context manager closed the connection, Ollama stops generating
+            raise
+        except Exception as e:
+            speculation.error = str(e)
+            
+    async def _commit_speculation(self, ten_env: TenEnv, speculation: SpeculativeRequest, user_text: str):
+        """Send the buffered response, waiting for the rest of it if needed"""
+        head_start = time.time() - speculation.started_at
+        try:
+            await speculation.task
+        except asyncio.CancelledError:
+            speculation.error = "cancelled"
+            
+        if speculation.error or not speculation.done:
+            logger.warning(f"Speculative response unusable ({speculation.error}), asking again")
+            self._discard_speculation(speculation, "misses", speculation.error or "incomplete")
+            await self._process_with_ollama(ten_env, user_text)
+            return
+            
+        self.speculation_stats["hits"] += 1
+        self.speculation_stats["used_tokens"] += speculation.tokens
+        self.speculation_stats["head_start_total"] += head_start
+        logger.info(f"Speculative response used, {head_start:.2f}s head start")
+        
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_text
+        })
+        self._send_response(ten_env, speculation.content)
+        
     async def _process_with_ollama(self, ten_env: TenEnv, user_text: str):
         """Process text with Ollama"""
         try:
@@ -84,15 +267,7 @@ class OllamaLLMExtension(Extension):
                 self.session = aiohttp.ClientSession()
             
             # Prepare request
-            payload = {
-                "model": self.model,
-                "messages": self.conversation_history,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_ctx": self.ctx_size
-                }
-            }
+            payload = self._chat_payload(self.conversation_history, stream=False)
             
             # Send request
             async with self.session.post(
@@ -103,27 +278,7 @@ class OllamaLLMExtension(Extension):
                     result = await response.json()
                     
                     # Extract response text
-                    assistant_text = result["message"]["content"]
-                    logger.info(f"Assistant: {assistant_text}")
-                    
-                    # Add to history
-                    self.conversation_history.append({
-                        "role": "assistant",
-                        "content": assistant_text
-                    })
-                    
-                    # Keep history size manageable
-                    if len(self.conversation_history) > 20:
-                        # Keep system prompt and last 18 messages
-                        self.conversation_history = (
-                            self.conversation_history[:1] + 
-                            self.conversation_history[-18:]
-                        )
-                    
-                    # Send to TTS
-                    response_data = Data.create("text")
-                    response_data.set_property("text", assistant_text)
-                    ten_env.send_data(response_data)
+                    self._send_response(ten_env, result["message"]["content"])
                     
                 else:
                     logger.error(f"Ollama API error: {response.status}")
@@ -131,6 +286,49 @@ class OllamaLLMExtension(Extension):
         except Exception as e:
             logger.error(f"Error processing with Ollama: {e}")
             
+    def _send_response(self, ten_env: TenEnv, assistant_text: str) -> None:
+        """Record the assistant turn and send it to TTS"""
+        logger.info(f"Assistant: {assistant_text}")
+        
+        # Add to history
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_text
+        })
+        
+        # Keep history size manageable
+        if len(self.conversation_history) > 20:
+            # Keep system prompt and last 18 messages
+            self.conversation_history = (
+                self.conversation_history[:1] + 
+                self.conversation_history[-18:]
+            )
+            
+        # Send to TTS
+        response_data = Data.create("text")
+        response_data.set_property("text", assistant_text)
+        ten_env.send_data(response_data)
+        
+    def on_cmd(self, ten_env: TenEnv, cmd: Cmd) -> None:
+        """Handle commands"""
+        cmd_name = cmd.get_name()
+        
+        if cmd_name == "get_stats":
+            stats = dict(self.speculation_stats)
+            finished = stats["hits"] + stats["misses"] + stats["cancelled"]
+            stats["hit_rate"] = round(stats["hits"] / finished, 4) if finished else 0.0
+            stats["mean_head_start"] = round(stats.pop("head_start_total") / stats["hits"], 3) if stats["hits"] else 0.0
+            stats["speculative"] = self.speculative
+            
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("stats", json.dumps({"speculation": stats}))
+            ten_env.return_result(result, cmd)
+            
+        else:
+            result = CmdResult.create(StatusCode.ERROR)
+            result.set_property_string("message", f"Unknown command: {cmd_name}")
+            ten_env.return_result(result, cmd)
+            
 
 def register_extension():
     """Register extension with TEN framework"""
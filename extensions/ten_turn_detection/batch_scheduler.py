@@ -0,0 +1,221 @@
+"""
+Cross-session micro-batching for turn detection inference
+
+Sessions that share a model submit their prompts to one scheduler instead of
+each running a single-sequence forward pass on its own thread. The scheduler
+collects requests for up to `max_wait` seconds (or until `max_batch_size`
+are queued), left-pads them into one batch, runs a single forward pass and
+hands every session the next-token logits for its own prompt.
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Hashable, List, Optional
+
+import torch
+
+from model_optimizer import position_ids_for
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the request latency histogram, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Request:
+    """One prompt waiting for its logits"""
+    
+    def __init__(self, token_ids: List[int]):
+        self.token_ids = token_ids
+        self.submitted_at = time.perf_counter()
+        self.done = threading.Event()
+        self.logits = None
+        self.error: Optional[Exception] = None
+
+
+class BatchScheduler:
+    """Batches next-token scoring requests from many sessions into one forward pass"""
+    
+    def __init__(self, model, pad_token_id: int, max_batch_size: int = 8, max_wait: float = 0.005):
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        
+        self.condition = threading.Condition()
+        self.pending: List[_Request] = []
+        self.running = False
+        self.worker_thread: Optional[threading.Thread] = None
+        self.sessions = 0
+        
+        # Statistics
+        self.requests = 0
+        self.batches = 0
+        self.failed = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        
+    def start(self) -> None:
+        """Run batches on a background thread"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self.worker_thread.start()
+            
+    def stop(self) -> None:
+        """Stop the worker, requests still queued fail"""
+        with self.condition:
+            self.running = False
+            pending, self.pending = self.pending, []
+            self.condition.notify_all()
+            
+        for request in pending:
+            request.error = RuntimeError("Turn detection batch scheduler stopped")
+            request.done.set()
+            
+        if self.worker_thread and self.worker_thread is not threading.current_thread():
+            self.worker_thread.join(timeout=1.0)
+        self.worker_thread = None
+        
+    def submit(self, token_ids: List[int], timeout: Optional[float] = None):
+        """Next-token logits for one prompt, blocks until its batch has run"""
+        request = _Request(list(token_ids))
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Turn detection batch scheduler is not running")
+            self.pending.append(request)
+            self.condition.notify_all()
+            
+        if not request.done.wait(timeout):
+            raise TimeoutError("Turn detection batch timed out")
+        if request.error is not None:
+            raise request.error
+        return request.logits
+        
+    def _worker_loop(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return
+                    
+                # Give other sessions until the oldest request's deadline to join the batch;
+                # each session has one request in flight, so stop waiting once all of them have
+                deadline = self.pending[0].submitted_at + self.max_wait
+                batch_size = min(self.max_batch_size, max(self.sessions, 1))
+                while self.running and len(self.pending) < batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.running:
+                    return
+                    
+                batch = self.pending[:self.max_batch_size]
+                del self.pending[:self.max_batch_size]
+                
+            self._run_batch(batch)
+            
+    def _run_batch(self, batch: List[_Request]) -> None:
+        """Left-pad the prompts, score them together and wake their sessions"""
+        try:
+            length = max(len(request.token_ids) for request in batch)
+            input_ids = torch.full((len(batch), length), self.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), length), dtype=torch.long)
+            for row, request in enumerate(batch):
+                # Left padding keeps every prompt's last token in the last column
+                input_ids[row, length - len(request.token_ids):] = torch.tensor(request.token_ids)
+                attention_mask[row, length - len(request.token_ids):] = 1
+                
+            device = self.model.device
+            with torch.no_grad():
+                outputs = self.model(
+                    input_ids=input_ids.to(device),
+                    attention_mask=attention_mask.to(device),
+                    position_ids=position_ids_for(attention_mask).to(device),
+                    use_cache=False
+                )
+            logits = outputs.logits[:, -1]
+            
+            for row, request in enumerate(batch):
+                request.logits = logits[row]
+        except Exception as e:
+            logger.error(f"Turn detection batch of {len(batch)} failed: {e}")
+            for request in batch:
+                request.error = e
+                
+        finished_at = time.perf_counter()
+        with self.condition:
+            self.batches += 1
+            self.requests += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            for request in batch:
+                if request.error is not None:
+                    self.failed += 1
+                latency_ms = (finished_at - request.submitted_at) * 1000
+                bucket = next(
+                    (i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound),
+                    len(LATENCY_BUCKETS_MS)
+                )
+                self.latency_counts[bucket] += 1
+                self.latency_total += latency_ms
+                self.latency_max = max(self.latency_max, latency_ms)
+                
+        for request in batch:
+            request.done.set()
+            
+    def stats(self) -> dict:
+        with self.condition:
+            latency_labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+            return {
+                "sessions": self.sessions,
+                "max_batch_size": self.max_batch_size,
+                "max_wait": self.max_wait,
+                "pending": len(self.pending),
+                "requests": self.requests,
+                "batches": self.batches,
+                "failed": self.failed,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                "latency_ms_histogram": dict(zip(latency_labels, self.latency_counts)),
+                "mean_latency_ms": round(self.latency_total / self.requests, 2) if self.requests else 0.0,
+                "max_latency_ms": round(self.latency_max, 2),
+            }
+
+
+# Process-wide schedulers, keyed by model and batching configuration
+_shared_schedulers: Dict[Hashable, BatchScheduler] = {}
+_shared_schedulers_lock = threading.Lock()
+
+
+def acquire_scheduler(model_key: Hashable, model, pad_token_id: int, max_batch_size: int = 8,
+                      max_wait: float = 0.005) -> tuple:
+    """The scheduler shared by every session on `model_key`, returns (key, scheduler)"""
+    key = (model_key, max_batch_size, max_wait)
+    with _shared_schedulers_lock:
+        scheduler = _shared_schedulers.get(key)
+        if scheduler is None:
+            scheduler = BatchScheduler(model, pad_token_id, max_batch_size, max_wait)
+            _shared_schedulers[key] = scheduler
+        scheduler.sessions += 1
+        scheduler.start()
+        return key, scheduler
+
+
+def release_scheduler(key: Hashable) -> None:
+    """Drop one session, the last one stops the scheduler"""
+    with _shared_schedulers_lock:
+        scheduler = _shared_schedulers.get(key)
+        if scheduler is None:
+            return
+        scheduler.sessions -= 1
+        if scheduler.sessions > 0:
+            return
+        del _shared_schedulers[key]
+        
+    scheduler.stop()
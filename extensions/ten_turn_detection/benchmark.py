@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Turn detection model benchmark for TEN Agent
+Usage: python benchmark.py [--model <path>] [--formats torch torch_int8 onnx_int8] [--sentences file.txt] [--sessions 8]
+
+Scores a fixed sentence set (built in, or one sentence per line from
+--sentences) with every model format and reports per-sentence latency and
+how often each format agrees with the fp32 labels. Optimized formats are
+converted and cached by model_optimizer.py on first use. With --sessions N
+every format is also driven by N concurrent sessions, once with a forward
+pass per session and once through the shared batch scheduler, and the
+aggregate throughput of both is reported.
+"""
+
+import sys
+import json
+import threading
+import time
+import argparse
+import logging
+
+import numpy as np
+import torch
+
+from model_optimizer import MODEL_FORMATS, load_model
+from batch_scheduler import BatchScheduler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABELS = ("finished", "unfinished", "wait")
+
+SENTENCES = [
+    "What's the weather like today?",
+    "Can you tell me a joke?",
+    "I was wondering if you could",
+    "So the thing is, when I went to the",
+    "Thanks, that's all I needed.",
+    "Wait, hold on a second.",
+    "Stop talking please.",
+    "My name is",
+    "I'd like to book a table for two at seven.",
+    "And then",
+    "Could you repeat that?",
+    "Okay.",
+    "Let me think about it, um",
+    "Play some jazz music.",
+    "I need to buy milk, eggs, and",
+    "Goodbye!",
+    "Hmm, actually, never mind.",
+    "Set a timer for ten minutes.",
+    "The reason I'm calling is because",
+    "Be quiet for a moment.",
+]
+
+
+def label_token_ids(tokenizer):
+    """First token of each label"""
+    return [tokenizer.encode(label, add_special_tokens=False)[0] for label in LABELS]
+
+
+def classify(model, tokenizer, token_ids, text, system_prompt="", scheduler=None):
+    """Label and confidence from one forward pass, as the extension scores it"""
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    messages.append({"role": "user", "content": text})
+    input_ids = tokenizer.apply_chat_template(
+        messages,
+        add_generation_prompt=True,
+        return_tensors="pt",
+        return_dict=False
+    ).to(model.device)
+    
+    if scheduler is not None:
+        logits = scheduler.submit(input_ids[0].tolist())
+    else:
+        with torch.no_grad():
+            logits = model(input_ids).logits[0, -1]
+            
+    probabilities = torch.softmax(logits[token_ids].float(), dim=-1)
+    index = int(torch.argmax(probabilities))
+    return LABELS[index], float(probabilities[index])
+
+
+def sessions_throughput(model, tokenizer, token_ids, sentences, sessions, system_prompt, scheduler=None):
+    """Sentences per second with `sessions` threads each scoring every sentence"""
+    def run_session():
+        for text in sentences:
+            classify(model, tokenizer, token_ids, text, system_prompt, scheduler)
+            
+    workers = [threading.Thread(target=run_session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return round(sessions * len(sentences) / (time.perf_counter() - start), 1)
+
+
+def benchmark_format(model_path, model_format, sentences, cache_dir, threads, system_prompt, sessions=0,
+                     max_batch_wait=0.005):
+    """Score every sentence with one format and collect latencies"""
+    load_start = time.time()
+    tokenizer, model = load_model(model_path, model_format, torch.float32, cache_dir=cache_dir, threads=threads)
+    load_time = time.time() - load_start
+    token_ids = label_token_ids(tokenizer)
+    
+    # Warm-up so one-time allocations do not count against the first sentence
+    classify(model, tokenizer, token_ids, sentences[0], system_prompt)
+    
+    labels = []
+    latencies = []
+    for text in sentences:
+        start = time.perf_counter()
+        labels.append(classify(model, tokenizer, token_ids, text, system_prompt)[0])
+        latencies.append(time.perf_counter() - start)
+        
+    latencies_ms = np.array(latencies) * 1000
+    result = {
+        "format": model_format,
+        "load_time": round(load_time, 2),
+        "mean_ms": round(float(latencies_ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "labels": labels,
+    }
+    
+    if sessions > 1:
+        result["unbatched_per_s"] = sessions_throughput(
+            model, tokenizer, token_ids, sentences, sessions, system_prompt
+        )
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id or 0
+        scheduler = BatchScheduler(model, pad_token_id, max_batch_size=sessions, max_wait=max_batch_wait)
+        scheduler.sessions = sessions  # all sessions join up front, full batches need no wait
+        scheduler.start()
+        try:
+            result["batched_per_s"] = sessions_throughput(
+                model, tokenizer, token_ids, sentences, sessions, system_prompt, scheduler
+            )
+            result["batching"] = scheduler.stats()
+        finally:
+            scheduler.stop()
+            
+    return result
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare turn detection model formats on CPU")
+    parser.add_argument("--model", default="TEN-framework/TEN_Turn_Detection", help="Model path or hub name")
+    parser.add_argument("--formats", nargs="+", default=list(MODEL_FORMATS), choices=MODEL_FORMATS)
+    parser.add_argument("--sentences", help="Text file with one sentence per line")
+    parser.add_argument("--system-prompt", default="", help="System prompt, as configured for the extension")
+    parser.add_argument("--cache-dir", default="", help="Artifact cache passed to model_optimizer")
+    parser.add_argument("--threads", type=int, default=0, help="torch / ONNX Runtime threads (0 = default)")
+    parser.add_argument("--sessions", type=int, default=0, help="Also measure throughput with N concurrent sessions")
+    parser.add_argument("--max-batch-wait", type=float, default=0.005, help="Batch scheduler wait (seconds)")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    
+    sentences = SENTENCES
+    if args.sentences:
+        with open(args.sentences, "r", encoding="utf-8") as f:
+            sentences = [line.strip() for line in f if line.strip()]
+            
+    # fp32 labels are the reference, so the original checkpoint always runs first
+    formats = ["torch"] + [model_format for model_format in args.formats if model_format != "torch"]
+    
+    results = []
+    for model_format in formats:
+        try:
+            results.append(benchmark_format(
+                args.model, model_format, sentences, args.cache_dir, args.threads, args.system_prompt,
+                args.sessions, args.max_batch_wait
+            ))
+        except ImportError as e:
+            logger.warning(f"Skipping {model_format}: {e}")
+            
+    if not results or results[0]["format"] != "torch":
+        sys.exit(1)
+        
+    reference = results[0]["labels"]
+    print(f"\n{len(sentences)} sentence(s), model {args.model}")
+    print(f"{'format':<12}{'load s':>8}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>9}{'agree':>8}")
+    for result in results:
+        result["agreement"] = round(
+            sum(label == ref for label, ref in zip(result["labels"], reference)) / len(reference), 4
+        )
+        speedup = results[0]["mean_ms"] / result["mean_ms"] if result["mean_ms"] else 0.0
+        print(f"{result['format']:<12}{result['load_time']:>8.2f}{result['mean_ms']:>10.2f}"
+              f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{speedup:>8.2f}x{result['agreement']:>8.1%}")
+              
+    if args.sessions > 1:
+        print(f"\n{args.sessions} concurrent session(s), sentences per second")
+        print(f"{'format':<12}{'unbatched':>11}{'batched':>10}{'mean batch':>12}")
+        for result in results:
+            print(f"{result['format']:<12}{result['unbatched_per_s']:>11.1f}{result['batched_per_s']:>10.1f}"
+                  f"{result['batching']['mean_batch_size']:>12.2f}")
+                  
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Adaptive endpointing for TEN Turn Detection
+Usage: python endpointing.py <session.jsonl> [more.jsonl ...] [--min-silence 0.05 0.1] [--max-silence 1.0 1.5]
+
+EndpointController decides when a user's turn is over by fusing the silence
+that follows a VAD speech_end with the turn model's latest verdict: the more
+likely the utterance is finished, the shorter the silence it waits for.
+
+Sessions recorded by the extension (endpoint_log_dir) hold the controller's
+inputs, one JSON object per line: {"t": seconds, "event": "speech_start" |
+"speech_end" | "verdict", "state", "confidence", "text"}. Run as a script,
+this module replays them for every combination of the given settings and
+reports decision latency against interruptions, where a silence counts as
+the end of a turn when the user stays quiet for longer than --resume-window.
+"""
+
+import sys
+import json
+import math
+import argparse
+import itertools
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def finished_probability(state: str, confidence: float) -> Optional[float]:
+    """Probability that the utterance is finished, None for "wait" (hold the turn)"""
+    if state == "finished":
+        return confidence
+    if state == "unfinished":
+        return 1.0 - confidence
+    return None
+
+
+class EndpointController:
+    """Silence timeout that adapts to the turn model's verdict
+    
+    Driven by an explicit clock (seconds, any origin) so the same decisions
+    are made live and when replaying a recorded session. A turn opens on
+    speech_start and ends at most once, when the silence since the last
+    speech_end reaches the timeout for the latest verdict: `min_silence` at
+    `finished_threshold` or above, rising linearly to `max_silence` as the
+    finished probability drops to zero. "wait" verdicts never end a turn.
+    """
+    
+    def __init__(self, min_silence: float = 0.1, max_silence: float = 1.5, finished_threshold: float = 0.9):
+        self.min_silence = min_silence
+        self.max_silence = max(min_silence, max_silence)
+        self.finished_threshold = finished_threshold
+        
+        # Statistics
+        self.end_of_turns = 0
+        self.resumed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        
+        self.reset()
+        
+    def reset(self) -> None:
+        self.speaking = False
+        self.turn_open = False
+        self.silence_start: Optional[float] = None
+        self.verdict: Optional[tuple] = None  # (state, confidence, text)
+        
+    def speech_start(self, now: float) -> None:
+        if self.turn_open and self.silence_start is not None and self.deadline() is not None:
+            # The user went on before the timeout ran out
+            self.resumed += 1
+        self.speaking = True
+        self.turn_open = True
+        self.silence_start = None
+        
+    def speech_end(self, now: float) -> None:
+        if self.speaking:
+            self.speaking = False
+            self.silence_start = now
+            
+    def update(self, state: str, confidence: float, text: str) -> None:
+        """Latest turn model verdict for the open turn"""
+        if self.turn_open:
+            self.verdict = (state, confidence, text)
+            
+    def timeout(self) -> Optional[float]:
+        """Silence needed to end the turn on the current verdict, None to hold it"""
+        if self.verdict is None:
+            return None
+            
+        probability = finished_probability(self.verdict[0], self.verdict[1])
+        if probability is None:
+            return None
+            
+        fraction = min(probability / self.finished_threshold, 1.0) if self.finished_threshold > 0 else 1.0
+        return self.max_silence - (self.max_silence - self.min_silence) * fraction
+        
+    def deadline(self) -> Optional[float]:
+        """Clock time at which the turn ends unless speech resumes or the verdict changes"""
+        if not self.turn_open or self.speaking or self.silence_start is None:
+            return None
+            
+        timeout = self.timeout()
+        return None if timeout is None else self.silence_start + timeout
+        
+    def poll(self, now: float) -> Optional[dict]:
+        """The end_of_turn decision once the deadline has passed, otherwise None"""
+        deadline = self.deadline()
+        if deadline is None or now < deadline:
+            return None
+            
+        state, confidence, text = self.verdict
+        decision = {
+            "text": text,
+            "state": state,
+            "confidence": confidence,
+            "silence_timeout": self.timeout(),
+            "silence_start": self.silence_start,
+            # A verdict that arrives after the timeout ends the turn on arrival
+            "decision_latency": now - self.silence_start,
+        }
+        
+        self.turn_open = False
+        self.verdict = None
+        self.end_of_turns += 1
+        self.latency_total += decision["decision_latency"]
+        self.latency_max = max(self.latency_max, decision["decision_latency"])
+        return decision
+        
+    def stats(self) -> dict:
+        return {
+            "min_silence": self.min_silence,
+            "max_silence": self.max_silence,
+            "finished_threshold": self.finished_threshold,
+            "end_of_turns": self.end_of_turns,
+            "resumed": self.resumed,
+            "mean_decision_latency": round(self.latency_total / self.end_of_turns, 4) if self.end_of_turns else 0.0,
+            "max_decision_latency": round(self.latency_max, 4),
+        }
+
+
+def load_session(file_path: str) -> List[dict]:
+    """Recorded controller inputs, in time order"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda event: event["t"])
+
+
+def replay(events: List[dict], controller: EndpointController) -> List[dict]:
+    """Feed a recorded session through `controller`, returns its end_of_turn decisions"""
+    decisions = []
+    last_event = float("-inf")
+    
+    def poll_until(now):
+        deadline = controller.deadline()
+        if deadline is not None and deadline <= now:
+            # A verdict that lands after its own deadline ends the turn on arrival
+            decisions.append(controller.poll(max(deadline, last_event)))
+            
+    for event in events:
+        poll_until(event["t"])
+        last_event = event["t"]
+        if event["event"] == "speech_start":
+            controller.speech_start(event["t"])
+        elif event["event"] == "speech_end":
+            controller.speech_end(event["t"])
+        elif event["event"] == "verdict":
+            controller.update(event["state"], event["confidence"], event.get("text", ""))
+            
+    # Silence at the end of the recording lasts forever
+    poll_until(float("inf"))
+    return decisions
+
+
+def score_session(events: List[dict], decisions: List[dict], resume_window: float) -> dict:
+    """Compare decisions with the pauses the user actually made"""
+    speech_ends = [event["t"] for event in events if event["event"] == "speech_end"]
+    speech_starts = [event["t"] for event in events if event["event"] == "speech_start"]
+    decided = {decision["silence_start"]: decision for decision in decisions}
+    
+    latencies = []
+    interruptions = 0
+    missed = 0
+    for speech_end in speech_ends:
+        next_start = next((start for start in speech_starts if start > speech_end), None)
+        turn_ended = next_start is None or next_start - speech_end > resume_window
+        decision = decided.get(speech_end)
+        if decision and turn_ended:
+            latencies.append(decision["decision_latency"])
+        elif decision:
+            interruptions += 1
+        elif turn_ended:
+            missed += 1
+            
+    return {"latencies": latencies, "interruptions": interruptions, "missed": missed, "pauses": len(speech_ends)}
+
+
+def main():
+    """Main function"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Tune adaptive endpointing on recorded sessions")
+    parser.add_argument("sessions", nargs="+", help="Session logs written by the extension (endpoint_log_dir)")
+    parser.add_argument("--min-silence", type=float, nargs="+", default=[0.05, 0.1, 0.2], help="Seconds")
+    parser.add_argument("--max-silence", type=float, nargs="+", default=[0.8, 1.2, 1.6], help="Seconds")
+    parser.add_argument("--finished-threshold", type=float, nargs="+", default=[0.8, 0.9])
+    parser.add_argument("--resume-window", type=float, default=2.0,
+                        help="Silence after which a pause counts as the end of the turn (seconds)")
+    parser.add_argument("--max-interruption-rate", type=float, default=0.02,
+                        help="Interruptions per pause allowed for the recommended setting")
+    parser.add_argument("--output", help="Write every result as JSON")
+    args = parser.parse_args()
+    
+    sessions = []
+    for file_path in args.sessions:
+        try:
+            sessions.append(load_session(file_path))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to load {file_path}: {e}")
+    if not sessions:
+        sys.exit(1)
+        
+    results = []
+    for min_silence, max_silence, threshold in itertools.product(
+            args.min_silence, args.max_silence, args.finished_threshold):
+        if max_silence < min_silence:
+            continue
+            
+        latencies = []
+        interruptions = missed = pauses = 0
+        for events in sessions:
+            score = score_session(events, replay(events, EndpointController(min_silence, max_silence, threshold)),
+                                  args.resume_window)
+            latencies.extend(score["latencies"])
+            interruptions += score["interruptions"]
+            missed += score["missed"]
+            pauses += score["pauses"]
+            
+        latencies.sort()
+        results.append({
+            "endpoint_min_silence": min_silence,
+            "endpoint_max_silence": max_silence,
+            "endpoint_finished_threshold": threshold,
+            "turns": len(latencies),
+            "mean_latency": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p95_latency": round(latencies[math.ceil(0.95 * len(latencies)) - 1], 3) if latencies else None,
+            "interruptions": interruptions,
+            "interruption_rate": round(interruptions / pauses, 4) if pauses else 0.0,
+            "missed": missed,
+        })
+        
+    results.sort(key=lambda result: (result["mean_latency"] is None, result["mean_latency"] or 0.0))
+    print(f"\n{len(sessions)} session(s), resume window {args.resume_window}s")
+    print(f"{'min s':>7}{'max s':>7}{'thresh':>8}{'turns':>7}{'mean s':>8}{'p95 s':>8}{'interrupt':>11}{'missed':>8}")
+    for result in results:
+        print(f"{result['endpoint_min_silence']:>7.2f}{result['endpoint_max_silence']:>7.2f}"
+              f"{result['endpoint_finished_threshold']:>8.2f}{result['turns']:>7}"
+              f"{result['mean_latency'] if result['mean_latency'] is not None else float('nan'):>8.3f}"
+              f"{result['p95_latency'] if result['p95_latency'] is not None else float('nan'):>8.3f}"
+              f"{result['interruption_rate']:>10.1%}{result['missed']:>8}")
+              
+    # Fastest setting that stays under the interruption budget
+    recommended = next((result for result in results if result["mean_latency"] is not None
+                        and result["interruption_rate"] <= args.max_interruption_rate), None)
+    if recommended:
+        print("\nRecommended properties: " + json.dumps({
+            key: recommended[key] for key in
+            ("endpoint_min_silence", "endpoint_max_silence", "endpoint_finished_threshold")
+        }))
+    else:
+        print(f"\nNo setting stays under {args.max_interruption_rate:.1%} interruptions")
+        
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
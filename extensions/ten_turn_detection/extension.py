@@ -14,81 +14,170 @@ from ten import (
 import threading
 import time
 import logging
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Hashable
 import queue
-import re
+import json
+import sys
+import os
+
+# Shared model registry for all extensions in this process
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../common'))
+from model_registry import model_registry
+from model_loader import ModelLoader
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from endpointing import EndpointController
+from simple_detector import SimpleTurnDetector
 
 # Try to import transformers for TEN Turn Detection model
 try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM
     import torch
+    from model_optimizer import load_model
+    from batch_scheduler import acquire_scheduler, release_scheduler
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Labels the turn detection model is trained to emit, in the order of its scores
+TURN_LABELS = ("finished", "unfinished", "wait")
+
 
-class SimpleTurnDetector:
-    """Simple rule-based turn detection fallback"""
+class CoalescingQueue:
+    """Latest-only scheduler for turn detection events
+    
+    Keeps at most one pending text per stream: a newer transcript replaces
+    the queued one in place, so a stream keeps its turn but is always scored
+    on its freshest text. vad_end events are served before any partial text
+    and supersede the partial still queued for their stream. Drop-in for
+    queue.Queue: put() takes (event_type, text, ten_env) and get() raises
+    queue.Empty on timeout.
+    """
     
     def __init__(self):
-        # Common turn-ending patterns
-        self.end_patterns = [
-            r'\?$',  # Questions
-            r'\.$',  # Statements ending with period
-            r'!$',   # Exclamations
-            r'thanks?\b',  # Thanks
-            r'\bbye\b|\bgoodbye\b',  # Goodbyes
-            r'\bok\b|\bokay\b|\balright\b',  # Confirmations
-        ]
-        
-        # Wait/stop patterns
-        self.wait_patterns = [
-            r'\bstop\b|\bwait\b|\bhold\b',
-            r'\bshut up\b|\bstop talking\b',
-            r'\bquiet\b|\bsilence\b',
-        ]
-        
-        # Unfinished patterns
-        self.unfinished_patterns = [
-            r'\band\s*$',  # Ending with "and"
-            r'\bbut\s*$',  # Ending with "but"
-            r'\bso\s*$',   # Ending with "so"
-            r',\s*$',      # Ending with comma
-            r'\bi\s*$',    # Just "I"
-            r'\bthe\s*$',  # Just "the"
-            r'\ba\s*$',    # Just "a"
-        ]
-        
-    def detect(self, text: str) -> tuple:
-        """Detect turn state: finished, unfinished, or wait"""
-        text = text.strip().lower()
-        
-        if not text:
-            return "unfinished", 0.1
-            
-        # Check for wait patterns first
-        for pattern in self.wait_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return "wait", 0.9
-        
-        # Check for unfinished patterns
-        for pattern in self.unfinished_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return "unfinished", 0.8
+        self.condition = threading.Condition()
+        self.pending_text: Dict[Hashable, tuple] = {}  # insertion ordered, oldest stream first
+        self.pending_end: Dict[Hashable, tuple] = {}
+        
+        # Statistics
+        self.enqueued = 0
+        self.served = 0
+        self.superseded = 0
+        self.max_wait = 0.0
+        
+    def put(self, event: tuple, stream: Optional[Hashable] = None) -> None:
+        """Queue an (event_type, text, ten_env) event, keyed by its TenEnv unless `stream` is given"""
+        event_type, text, ten_env = event
+        key = ten_env if stream is None else stream
+        
+        with self.condition:
+            self.enqueued += 1
+            if event_type == "vad_end":
+                if self.pending_text.pop(key, None) is not None:
+                    self.superseded += 1
+                if key in self.pending_end:
+                    self.superseded += 1
+                self.pending_end[key] = (event, time.time())
+            else:
+                if key in self.pending_text:
+                    self.superseded += 1
+                self.pending_text[key] = (event, time.time())
+            self.condition.notify()
+            
+    def get(self, timeout: Optional[float] = None) -> tuple:
+        """Next event, vad_end first"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.pending_end or self.pending_text, timeout):
+                raise queue.Empty
                 
-        # Check for finished patterns
-        for pattern in self.end_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return "finished", 0.9
+            pending = self.pending_end if self.pending_end else self.pending_text
+            event, enqueued_at = pending.pop(next(iter(pending)))
+            self.served += 1
+            self.max_wait = max(self.max_wait, time.time() - enqueued_at)
+            return event
+            
+    def clear(self) -> None:
+        with self.condition:
+            self.pending_text.clear()
+            self.pending_end.clear()
+            
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                "pending": len(self.pending_text) + len(self.pending_end),
+                "enqueued": self.enqueued,
+                "served": self.served,
+                "superseded": self.superseded,
+                "max_wait": round(self.max_wait, 4),
+            }
+
+
+class PrefixKVCache:
+    """Key/value cache for the stable start of the turn detection prompt
+    
+    Holds the model's past key/values for a token prefix (system prompt plus
+    committed history). When a new prefix starts with the cached one only the
+    added tokens are run through the model; any other change rebuilds it.
+    Scoring runs just the tokens after the prefix and leaves the cache as it
+    was, so partial transcripts never pay for the prefix again.
+    """
+    
+    def __init__(self):
+        self.token_ids: List[int] = []
+        self.past_key_values = None
+        self.hits = 0
+        self.extensions = 0
+        self.rebuilds = 0
+        
+    def clear(self) -> None:
+        self.token_ids = []
+        self.past_key_values = None
         
-        # Default: if text is short and doesn't match patterns, likely unfinished
-        if len(text.split()) < 3:
-            return "unfinished", 0.6
+    def update(self, model, prefix_ids: List[int], device) -> None:
+        """Make the cache hold exactly `prefix_ids`"""
+        cached = len(self.token_ids)
+        if self.past_key_values is not None and prefix_ids[:cached] == self.token_ids:
+            new_ids = prefix_ids[cached:]
+            if not new_ids:
+                return
+            self.extensions += 1
+        else:
+            self.clear()
+            new_ids = prefix_ids
+            if not new_ids:
+                return
+            self.rebuilds += 1
             
-        # Longer text without clear ending, moderate confidence it's finished
-        return "finished", 0.7
+        with torch.no_grad():
+            outputs = model(
+                torch.tensor([new_ids], device=device),
+                past_key_values=self.past_key_values,
+                use_cache=True
+            )
+        self.past_key_values = outputs.past_key_values
+        self.token_ids = list(prefix_ids)
+        
+    def next_token_logits(self, model, input_ids):
+        """Logits after `input_ids`, which must start with the cached prefix"""
+        cached = len(self.token_ids)
+        self.hits += 1
+        try:
+            with torch.no_grad():
+                outputs = model(input_ids[:, cached:], past_key_values=self.past_key_values, use_cache=True)
+        finally:
+            # DynamicCache grows in place, drop the scored tokens again
+            if hasattr(self.past_key_values, "crop"):
+                self.past_key_values.crop(cached)
+        return outputs.logits[0, -1]
+        
+    def stats(self) -> dict:
+        return {
+            "prefix_tokens": len(self.token_ids),
+            "hits": self.hits,
+            "extensions": self.extensions,
+            "rebuilds": self.rebuilds,
+        }
 
 
 class TenTurnDetectionExtension(Extension):
@@ -101,6 +190,43 @@ class TenTurnDetectionExtension(Extension):
         self.model_path = "TEN-framework/TEN_Turn_Detection"
         self.system_prompt = ""
         self.max_history_length = 5
+        self.model_idle_ttl = 300.0  # seconds a shared model outlives its last session
+        self.model_key = None
+        
+        # Background loading: start at once and use the simple detector until the model is warm
+        self.async_load = False
+        self.warm_up = True
+        self.model_loader: Optional[ModelLoader] = None
+        self.fallback_detections = 0
+        
+        # CPU optimization: "torch", "torch_int8", "onnx" or "onnx_int8" (see model_optimizer.py)
+        self.model_format = "torch"
+        self.optimized_model_dir = ""  # artifact cache, default ~/.cache/ten_turn_detection
+        self.threads = 0  # torch / ONNX Runtime threads, 0 = library default
+        
+        # "logits" scores the three labels in one forward pass, "generate" samples one token
+        self.scoring = "logits"
+        self.label_token_ids = None
+        
+        # Prompt context: "none" (current utterance only) or "history" (recent committed turns too)
+        self.context_mode = "none"
+        self.use_prefix_cache = True
+        self.prefix_cache = PrefixKVCache()
+        
+        # Cross-session micro-batching (logits scoring only, replaces the prefix cache)
+        self.batching = False
+        self.max_batch_size = 8
+        self.max_batch_wait = 0.005  # seconds
+        self.batch_key = None
+        self.batch_scheduler = None
+        
+        # Adaptive endpointing: end_of_turn once the silence fits the verdict
+        self.endpointing = False
+        self.endpoint_controller: Optional[EndpointController] = None
+        self.endpoint_env: Optional[TenEnv] = None
+        self.endpoint_log_dir = ""
+        self.endpoint_log = None
+        self.endpoint_clock_start = time.time()
         
         # Conversation state
         self.conversation_history: List[str] = []
@@ -110,7 +236,7 @@ class TenTurnDetectionExtension(Extension):
         self.last_turn_time = time.time()
         
         # Processing queue
-        self.processing_queue = queue.Queue()
+        self.processing_queue = CoalescingQueue()
         self.processing_thread = None
         self.running = False
         
@@ -129,8 +255,49 @@ class TenTurnDetectionExtension(Extension):
             self.model_path = ten_env.get_property_string("model_path") or "TEN-framework/TEN_Turn_Detection"
             self.system_prompt = ten_env.get_property_string("system_prompt") or ""
             self.max_history_length = ten_env.get_property_int("max_history_length") or 5
+            idle_ttl = ten_env.get_property_float("model_idle_ttl")
+            self.model_idle_ttl = 300.0 if idle_ttl is None else idle_ttl
+            self.async_load = ten_env.get_property_bool("async_load") or False
+            warm_up = ten_env.get_property_bool("warm_up")
+            self.warm_up = True if warm_up is None else warm_up
+            self.model_format = ten_env.get_property_string("model_format") or "torch"
+            self.optimized_model_dir = ten_env.get_property_string("optimized_model_dir") or ""
+            self.threads = ten_env.get_property_int("threads") or 0
+            self.scoring = ten_env.get_property_string("scoring") or "logits"
+            if self.scoring not in ("logits", "generate"):
+                logger.warning(f"Unknown scoring mode {self.scoring}, using logits")
+                self.scoring = "logits"
+            self.context_mode = ten_env.get_property_string("context_mode") or "none"
+            if self.context_mode not in ("none", "history"):
+                logger.warning(f"Unknown context mode {self.context_mode}, using none")
+                self.context_mode = "none"
+            prefix_cache = ten_env.get_property_bool("prefix_cache")
+            self.use_prefix_cache = True if prefix_cache is None else prefix_cache
+            self.batching = ten_env.get_property_bool("batching") or False
+            self.max_batch_size = ten_env.get_property_int("max_batch_size") or 8
+            batch_wait = ten_env.get_property_float("max_batch_wait")
+            self.max_batch_wait = 0.005 if batch_wait is None else batch_wait
+            self.endpointing = ten_env.get_property_bool("endpointing") or False
+            if self.endpointing:
+                min_silence = ten_env.get_property_float("endpoint_min_silence")
+                max_silence = ten_env.get_property_float("endpoint_max_silence")
+                threshold = ten_env.get_property_float("endpoint_finished_threshold")
+                self.endpoint_controller = EndpointController(
+                    0.1 if min_silence is None else min_silence,
+                    1.5 if max_silence is None else max_silence,
+                    0.9 if threshold is None else threshold
+                )
+            self.endpoint_log_dir = ten_env.get_property_string("endpoint_log_dir") or ""
             
-            logger.info(f"Configured turn detection - model: {self.model_path}")
+            if self.model_format.startswith("onnx") and self.scoring != "logits":
+                logger.warning("ONNX turn detection models only support logits scoring")
+                self.scoring = "logits"
+                
+            logger.info(f"Configured turn detection - model: {self.model_path} ({self.model_format}), scoring: {self.scoring}")
+            logger.info(f"Context: {self.context_mode}, prefix cache: {self.use_prefix_cache}, batching: {self.batching}")
+            if self.endpoint_controller:
+                logger.info(f"Endpointing: {self.endpoint_controller.min_silence}-{self.endpoint_controller.max_silence}s "
+                            f"silence, finished threshold {self.endpoint_controller.finished_threshold}")
             
             ten_env.on_configure_done()
             
@@ -143,54 +310,157 @@ class TenTurnDetectionExtension(Extension):
         logger.info("Turn Detection: on_start")
         
         try:
-            # Try to load TEN Turn Detection model
-            if TRANSFORMERS_AVAILABLE:
-                try:
-                    logger.info(f"Loading TEN Turn Detection model: {self.model_path}")
-                    self.tokenizer = AutoTokenizer.from_pretrained(
-                        self.model_path, 
-                        trust_remote_code=True
-                    )
-                    self.model = AutoModelForCausalLM.from_pretrained(
-                        self.model_path,
-                        trust_remote_code=True,
-                        torch_dtype=torch.bfloat16 if torch.cuda.is_available() else torch.float32
-                    )
-                    
-                    if torch.cuda.is_available():
-                        self.model = self.model.cuda()
-                        
-                    self.model.eval()
-                    logger.info("TEN Turn Detection model loaded successfully")
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to load TEN model: {e}, using simple detector")
-                    self.model = None
-                    self.tokenizer = None
-            else:
-                logger.info("Transformers not available, using simple turn detector")
+            if self.endpoint_controller and self.endpoint_log_dir:
+                self._open_endpoint_log()
                 
-            # Start processing thread
+            # Start processing thread, it uses the simple detector until the model is ready
             self.running = True
             self.processing_thread = threading.Thread(target=self._processing_loop)
             self.processing_thread.start()
             
+            # Try to load TEN Turn Detection model
+            if TRANSFORMERS_AVAILABLE:
+                self.model_loader = ModelLoader(
+                    "Turn detection",
+                    self._acquire_model,
+                    self._warm_up_model if self.warm_up else None
+                )
+                if self.async_load:
+                    logger.info(f"Loading TEN Turn Detection model in the background: {self.model_path}")
+                    self.model_loader.start()
+                elif not self.model_loader.run():
+                    logger.warning("Failed to load TEN model, using simple detector")
+            else:
+                logger.info("Transformers not available, using simple turn detector")
+                
             ten_env.on_start_done()
             
         except Exception as e:
             logger.error(f"Failed to start turn detection: {e}")
             ten_env.on_start_done()
             
+    def _acquire_model(self) -> None:
+        """Acquire the shared model and the per-session state that depends on it"""
+        logger.info(f"Loading TEN Turn Detection model: {self.model_path}")
+        dtype = torch.bfloat16 if torch.cuda.is_available() and self.model_format == "torch" else torch.float32
+        model_key = ("turn_detection", self.model_path, self.model_format, str(dtype))
+        tokenizer, model = model_registry.acquire(
+            model_key,
+            lambda: self._load_model(dtype),
+            idle_ttl=self.model_idle_ttl
+        )
+        
+        with self.lock:
+            if not self.running:
+                # Stopped while loading in the background
+                model_registry.release(model_key)
+                raise RuntimeError("Extension stopped during model load")
+                
+            self.model_key = model_key
+            self.tokenizer, self.model = tokenizer, model
+            logger.info("TEN Turn Detection model loaded successfully")
+            
+            if self.scoring == "logits":
+                self.label_token_ids = self._resolve_label_tokens()
+                
+            if self.batching:
+                self._join_batch_scheduler()
+                
+    def _warm_up_model(self) -> None:
+        """One throwaway inference, also fills the prefix cache with the system prompt"""
+        self._detect_with_model("Hello, how are you today?")
+        
+    def _model_ready(self) -> bool:
+        return self.model_loader is not None and self.model_loader.ready and self.model is not None
+        
+    def _load_model(self, dtype) -> tuple:
+        """Load tokenizer and model, called once per process by the model registry"""
+        return load_model(
+            self.model_path,
+            self.model_format,
+            dtype,
+            cache_dir=self.optimized_model_dir,
+            threads=self.threads
+        )
+        
+    def _open_endpoint_log(self) -> None:
+        """One JSONL file per session with the endpointing inputs, for endpointing.py"""
+        try:
+            os.makedirs(self.endpoint_log_dir, exist_ok=True)
+            self.endpoint_clock_start = time.time()
+            file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{id(self):x}.jsonl"
+            self.endpoint_log = open(os.path.join(self.endpoint_log_dir, file_name), "w", encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Cannot record endpointing session in {self.endpoint_log_dir}: {e}")
+            self.endpoint_log = None
+            
+    def _join_batch_scheduler(self) -> None:
+        """Share one micro-batching scheduler with every session on the same model"""
+        if self.scoring != "logits":
+            logger.warning("Batching needs logits scoring, running unbatched")
+            return
+            
+        pad_token_id = self.tokenizer.pad_token_id
+        if pad_token_id is None:
+            pad_token_id = self.tokenizer.eos_token_id or 0
+            
+        self.batch_key, self.batch_scheduler = acquire_scheduler(
+            self.model_key,
+            self.model,
+            pad_token_id,
+            self.max_batch_size,
+            self.max_batch_wait
+        )
+        logger.info(f"Joined turn detection batch scheduler ({self.batch_scheduler.stats()['sessions']} sessions)")
+        
+    def _resolve_label_tokens(self) -> Optional[List[int]]:
+        """First token of each label, None if the labels cannot be told apart by it"""
+        token_ids = []
+        for label in TURN_LABELS:
+            ids = self.tokenizer.encode(label, add_special_tokens=False)
+            if not ids:
+                break
+            token_ids.append(ids[0])
+            
+        if len(token_ids) != len(TURN_LABELS) or len(set(token_ids)) != len(TURN_LABELS):
+            logger.warning("Turn labels do not map to distinct tokens, using generate scoring")
+            self.scoring = "generate"
+            return None
+            
+        return token_ids
+        
     def on_stop(self, ten_env: TenEnv) -> None:
         """Stop extension"""
         logger.info("Turn Detection: on_stop")
         
         try:
-            self.running = False
-            
+            with self.lock:
+                self.running = False
+                
             if self.processing_thread:
                 self.processing_thread.join(timeout=5)
                 
+            if self.model_loader:
+                # A warm-up in flight still uses the model
+                self.model_loader.join(timeout=5)
+                
+            with self.lock:
+                if self.endpoint_log:
+                    self.endpoint_log.close()
+                    self.endpoint_log = None
+                batch_key, self.batch_key = self.batch_key, None
+                model_key, self.model_key = self.model_key, None
+                self.batch_scheduler = None
+                self.model = None
+                self.tokenizer = None
+                
+            if batch_key:
+                release_scheduler(batch_key)
+                
+            if model_key:
+                self.prefix_cache.clear()
+                model_registry.release(model_key)
+                
             ten_env.on_stop_done()
             
         except Exception as e:
@@ -213,6 +483,13 @@ class TenTurnDetectionExtension(Extension):
                     # Queue for processing
                     self.processing_queue.put(("text", text, ten_env))
                     
+            elif data_name == "text_partial":
+                # Score streaming partials right away so a likely-finished turn is
+                # seen before the final transcript; they never enter the history
+                text = data.get_property_string("text")
+                if text:
+                    self.processing_queue.put(("text", text, ten_env))
+                    
             elif data_name == "vad_result":
                 # Handle VAD results
                 is_speech = data.get_property_bool("is_speech")
@@ -221,7 +498,10 @@ class TenTurnDetectionExtension(Extension):
                 with self.lock:
                     prev_vad_state = self.last_vad_state
                     self.last_vad_state = is_speech
-                    
+                    if self.endpoint_controller and is_speech != prev_vad_state:
+                        self.endpoint_env = ten_env
+                        self._endpoint_event("speech_start" if is_speech else "speech_end")
+                        
                 # Detect speech-to-silence transition
                 if prev_vad_state and not is_speech and self.current_text:
                     # User stopped speaking, analyze the text
@@ -236,7 +516,7 @@ class TenTurnDetectionExtension(Extension):
             try:
                 # Process queue with timeout
                 try:
-                    event_type, text, ten_env = self.processing_queue.get(timeout=1.0)
+                    event_type, text, ten_env = self.processing_queue.get(timeout=self._next_wakeup())
                     
                     if event_type == "text":
                         # Process text immediately for real-time feedback
@@ -246,11 +526,74 @@ class TenTurnDetectionExtension(Extension):
                         self._process_turn_detection(ten_env, text, immediate=False)
                         
                 except queue.Empty:
-                    continue
+                    pass
+                    
+                if self.endpoint_controller:
+                    self._poll_endpoint()
                     
             except Exception as e:
                 logger.error(f"Error in turn detection processing loop: {e}")
                 
+    def _next_wakeup(self) -> float:
+        """Queue timeout: at most 1s, less when an endpoint deadline is pending"""
+        if not self.endpoint_controller:
+            return 1.0
+        with self.lock:
+            deadline = self.endpoint_controller.deadline()
+        if deadline is None:
+            return 1.0
+        return min(1.0, max(0.0, deadline - self._endpoint_clock()))
+        
+    def _endpoint_clock(self) -> float:
+        """Seconds since the session started, the endpointing clock"""
+        return time.time() - self.endpoint_clock_start
+        
+    def _endpoint_event(self, event: str, **fields) -> None:
+        """Feed one input to the endpoint controller and record it, caller holds the lock"""
+        now = self._endpoint_clock()
+        if event == "speech_start":
+            self.endpoint_controller.speech_start(now)
+        elif event == "speech_end":
+            self.endpoint_controller.speech_end(now)
+        else:
+            self.endpoint_controller.update(fields["state"], fields["confidence"], fields["text"])
+            
+        if self.endpoint_log:
+            try:
+                self.endpoint_log.write(json.dumps({"t": round(now, 4), "event": event, **fields}) + "\n")
+                self.endpoint_log.flush()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Stopped recording endpointing session: {e}")
+                self.endpoint_log = None
+                
+    def _poll_endpoint(self) -> None:
+        """Send end_of_turn once the controller decides the turn is over"""
+        with self.lock:
+            decision = self.endpoint_controller.poll(self._endpoint_clock())
+            if decision is None:
+                return
+            # The turn is over, a late vad_end must not score its text again
+            self.current_text = ""
+            ten_env = self.endpoint_env
+            
+        if ten_env is None:
+            return
+            
+        try:
+            output_data = Data.create("end_of_turn")
+            output_data.set_property_string("text", decision["text"])
+            output_data.set_property_string("state", decision["state"])
+            output_data.set_property_float("confidence", decision["confidence"])
+            output_data.set_property_float("silence_timeout", decision["silence_timeout"])
+            output_data.set_property_float("decision_latency", decision["decision_latency"])
+            ten_env.send_data(output_data)
+            
+            logger.info(f"End of turn: '{decision['text']}' after {decision['decision_latency'] * 1000:.0f}ms of silence "
+                        f"(timeout {decision['silence_timeout'] * 1000:.0f}ms, {decision['state']} {decision['confidence']:.2f})")
+                        
+        except Exception as e:
+            logger.error(f"Error sending end of turn: {e}")
+                
     def _process_turn_detection(self, ten_env: TenEnv, text: str, immediate: bool = False) -> None:
         """Process text for turn detection"""
         try:
@@ -258,12 +601,17 @@ class TenTurnDetectionExtension(Extension):
                 return
                 
             # Use TEN Turn Detection model if available
-            if self.model and self.tokenizer:
+            if self._model_ready():
                 state, confidence = self._detect_with_model(text)
             else:
-                # Use simple fallback detector
+                # Use simple fallback detector, also while the model is still loading
                 state, confidence = self.simple_detector.detect(text)
+                self.fallback_detections += 1
                 
+            if self.endpoint_controller:
+                with self.lock:
+                    self._endpoint_event("verdict", state=state, confidence=round(confidence, 4), text=text)
+                    
             # Determine if agent should respond
             should_respond = self._should_agent_respond(state, confidence, immediate)
             
@@ -277,6 +625,10 @@ class TenTurnDetectionExtension(Extension):
                     if len(self.conversation_history) > self.max_history_length:
                         self.conversation_history.pop(0)
                         
+                # Extend the cached prefix now, not on the next partial transcript
+                if self.context_mode == "history" and self._model_ready() and self._prefix_cache_enabled():
+                    self._update_prefix_cache(self._prefix_messages())
+                    
         except Exception as e:
             logger.error(f"Error in turn detection processing: {e}")
             
@@ -284,53 +636,100 @@ class TenTurnDetectionExtension(Extension):
         """Use TEN Turn Detection model for inference"""
         try:
             # Prepare messages for the model
-            messages = [
-                {"role": "system", "content": self.system_prompt}
-            ] if self.system_prompt else []
-            
-            messages.append({"role": "user", "content": text})
+            prefix_messages = self._prefix_messages()
+            messages = prefix_messages + [{"role": "user", "content": text}]
             
             # Apply chat template
             input_ids = self.tokenizer.apply_chat_template(
                 messages,
                 add_generation_prompt=True,
-                return_tensors="pt"
+                return_tensors="pt",
+                return_dict=False
             )
             
-            if torch.cuda.is_available():
-                input_ids = input_ids.cuda()
-                
-            # Generate prediction
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    input_ids,
-                    max_new_tokens=1,
-                    do_sample=True,
-                    top_p=0.1,
-                    temperature=0.1,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-                
-            # Decode response
-            response = outputs[0][input_ids.shape[-1]:]
-            output = self.tokenizer.decode(response, skip_special_tokens=True).strip()
-            
-            # Map output to state and confidence
-            if output.lower() in ['f', 'finished']:
-                return "finished", 0.9
-            elif output.lower() in ['w', 'wait']:
-                return "wait", 0.9
-            elif output.lower() in ['u', 'unfinished']:
-                return "unfinished", 0.9
-            else:
-                # Fallback to simple detector if model output is unclear
-                return self.simple_detector.detect(text)
-                
+            input_ids = input_ids.to(self.model.device)
+            
+            if self.scoring == "logits":
+                if self.batch_scheduler:
+                    return self._score_labels(self.batch_scheduler.submit(input_ids[0].tolist()))
+                    
+                if self._prefix_cache_enabled() and self._update_prefix_cache(prefix_messages, input_ids):
+                    return self._score_labels(self.prefix_cache.next_token_logits(self.model, input_ids))
+                    
+                with torch.no_grad():
+                    return self._score_labels(self.model(input_ids).logits[0, -1])
+            return self._generate_label(input_ids, text)
+            
         except Exception as e:
             logger.error(f"Error using TEN Turn Detection model: {e}")
             # Fallback to simple detector
             return self.simple_detector.detect(text)
             
+    def _prefix_messages(self) -> List[Dict[str, str]]:
+        """System prompt and, in history mode, the recent committed turns"""
+        messages = [
+            {"role": "system", "content": self.system_prompt}
+        ] if self.system_prompt else []
+        
+        if self.context_mode == "history":
+            with self.lock:
+                history = list(self.conversation_history)
+            messages.extend({"role": "user", "content": turn} for turn in history)
+            
+        return messages
+        
+    def _prefix_cache_enabled(self) -> bool:
+        return (self.use_prefix_cache and self.scoring == "logits" and self.model is not None and
+                self.batch_scheduler is None and getattr(self.model, "supports_kv_cache", True))
+        
+    def _update_prefix_cache(self, prefix_messages: List[Dict[str, str]], input_ids=None) -> bool:
+        """Bring the prefix cache up to date, False if the prompt does not start with the prefix"""
+        if not prefix_messages:
+            self.prefix_cache.clear()
+            return True
+            
+        prefix_ids = self.tokenizer.apply_chat_template(prefix_messages, tokenize=True, return_dict=False)
+        if input_ids is not None and input_ids[0, :len(prefix_ids)].tolist() != list(prefix_ids):
+            # The chat template renders earlier turns differently once more follow
+            return False
+            
+        self.prefix_cache.update(self.model, list(prefix_ids), self.model.device)
+        return True
+        
+    def _score_labels(self, logits) -> tuple:
+        """Softmax over the next-token logits of the three labels"""
+        probabilities = torch.softmax(logits[self.label_token_ids].float(), dim=-1)
+        index = int(torch.argmax(probabilities))
+        return TURN_LABELS[index], float(probabilities[index])
+        
+    def _generate_label(self, input_ids, text: str) -> tuple:
+        """Sample one token and match it against the labels"""
+        # Generate prediction
+        with torch.no_grad():
+            outputs = self.model.generate(
+                input_ids,
+                max_new_tokens=1,
+                do_sample=True,
+                top_p=0.1,
+                temperature=0.1,
+                pad_token_id=self.tokenizer.eos_token_id
+            )
+            
+        # Decode response
+        response = outputs[0][input_ids.shape[-1]:]
+        output = self.tokenizer.decode(response, skip_special_tokens=True).strip()
+        
+        # Map output to state and confidence
+        if output.lower() in ['f', 'finished']:
+            return "finished", 0.9
+        elif output.lower() in ['w', 'wait']:
+            return "wait", 0.9
+        elif output.lower() in ['u', 'unfinished']:
+            return "unfinished", 0.9
+        else:
+            # Fallback to simple detector if model output is unclear
+            return self.simple_detector.detect(text)
+            
     def _should_agent_respond(self, state: str, confidence: float, immediate: bool) -> bool:
         """Determine if the agent should respond based on turn state"""
         current_time = time.time()
@@ -382,11 +781,36 @@ class TenTurnDetectionExtension(Extension):
                 self.conversation_history.clear()
                 self.current_text = ""
                 self.text_buffer = ""
-                
+                if self.endpoint_controller:
+                    self.endpoint_controller.reset()
+            self.processing_queue.clear()
+            
             result = CmdResult.create(StatusCode.OK)
             result.set_property_string("message", "Conversation history reset")
             ten_env.return_result(result, cmd)
             
+        elif cmd_name == "get_stats":
+            stats = {
+                "model": self.model_loader.stats() if self.model_loader else {"state": "unavailable", "ready": False},
+                "fallback_detections": self.fallback_detections,
+                "model_format": self.model_format,
+                "scoring": self.scoring,
+                "context_mode": self.context_mode,
+                "history_turns": len(self.conversation_history),
+                "prefix_cache": self.prefix_cache.stats(),
+                "queue": self.processing_queue.stats(),
+            }
+            batch_scheduler = self.batch_scheduler
+            if batch_scheduler:
+                stats["batching"] = batch_scheduler.stats()
+            if self.endpoint_controller:
+                with self.lock:
+                    stats["endpointing"] = self.endpoint_controller.stats()
+            
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("stats", json.dumps(stats))
+            ten_env.return_result(result, cmd)
+            
         else:
             result = CmdResult.create(StatusCode.ERROR)
             result.set_property_string("message", f"Unknown command: {cmd_name}")
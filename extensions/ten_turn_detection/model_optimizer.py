@@ -0,0 +1,231 @@
+"""
+CPU-optimized variants of the TEN Turn Detection model
+
+Formats:
+  torch       the checkpoint as published (fp32 on CPU, bf16 on CUDA)
+  torch_int8  dynamic int8 quantization of every nn.Linear
+  onnx        ONNX graph returning the last-position logits, run by ONNX Runtime
+  onnx_int8   the ONNX graph with int8 dynamic weight quantization
+
+ONNX formats are converted once and cached on disk under
+<cache_dir>/<model>/<format>/ together with the tokenizer, so later starts
+skip both the fp32 checkpoint and the export. torch_int8 is quantized from
+the fp32 checkpoint at load time: it takes a few seconds and its packed
+weights do not survive pickling reliably across torch versions.
+Usage: python model_optimizer.py --model <path or hub name> --format onnx_int8 onnx
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import logging
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMATS = ("torch", "torch_int8", "onnx", "onnx_int8")
+CACHED_FORMATS = ("onnx", "onnx_int8")
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ten_turn_detection")
+
+
+def artifact_dir(model_path: str, model_format: str, cache_dir: str = "") -> str:
+    """Where the converted artifact for a model and format lives"""
+    name = re.sub(r"[^\w.-]+", "_", model_path.strip("/"))
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, name, model_format)
+
+
+def set_threads(threads: int) -> None:
+    """Set the torch intra-op thread count, 0 keeps the default"""
+    if threads:
+        torch.set_num_threads(threads)
+
+
+def load_checkpoint(model_path: str, dtype=None) -> tuple:
+    """Tokenizer and model from the original checkpoint"""
+    if dtype is None:
+        dtype = torch.bfloat16 if torch.cuda.is_available() else torch.float32
+        
+    tokenizer = AutoTokenizer.from_pretrained(
+        model_path,
+        trust_remote_code=True
+    )
+    model = AutoModelForCausalLM.from_pretrained(
+        model_path,
+        trust_remote_code=True,
+        torch_dtype=dtype
+    )
+    
+    if torch.cuda.is_available() and dtype != torch.float32:
+        model = model.cuda()
+        
+    model.eval()
+    return tokenizer, model
+
+
+def position_ids_for(attention_mask: torch.Tensor) -> torch.Tensor:
+    """Positions that skip left padding"""
+    return (attention_mask.long().cumsum(-1) - 1).clamp(min=0)
+
+
+class LastTokenLogits(torch.nn.Module):
+    """Export wrapper: next-token logits only, no KV cache outputs"""
+    
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        
+    def forward(self, input_ids, attention_mask, position_ids):
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            use_cache=False
+        )
+        return outputs.logits[:, -1, :]
+
+
+class OnnxTurnModel:
+    """ONNX Runtime session behind the part of the transformers API the extension uses
+    
+    Returns logits for the last position only and keeps no KV cache, so the
+    prefix cache and generate() scoring are not available with it.
+    """
+    
+    supports_kv_cache = False
+    
+    def __init__(self, onnx_path: str, threads: int = 0):
+        import onnxruntime
+        
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(onnx_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self.device = torch.device("cpu")
+        
+    def __call__(self, input_ids, attention_mask=None, position_ids=None, **kwargs):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        if position_ids is None:
+            position_ids = position_ids_for(attention_mask)
+            
+        logits = self.session.run(["logits"], {
+            "input_ids": input_ids.cpu().numpy().astype(np.int64),
+            "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+            "position_ids": position_ids.cpu().numpy().astype(np.int64),
+        })[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits)[:, None, :])
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every nn.Linear, activations stay float"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def convert(model_path: str, model_format: str, cache_dir: str = "", threads: int = 0) -> str:
+    """Export the fp32 checkpoint to `model_format` and cache it, returns the artifact directory"""
+    if model_format not in CACHED_FORMATS:
+        raise ValueError(f"Nothing to convert for model format: {model_format}")
+        
+    output_dir = artifact_dir(model_path, model_format, cache_dir)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    set_threads(threads)
+    
+    start_time = time.time()
+    tokenizer, model = load_checkpoint(model_path, torch.float32)
+    
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    fp32_path = onnx_path if model_format == "onnx" else os.path.join(output_dir, "model_fp32.onnx")
+    
+    sample = tokenizer("hello", return_tensors="pt")
+    attention_mask = sample["attention_mask"]
+    with torch.no_grad():
+        torch.onnx.export(
+            LastTokenLogits(model),
+            (sample["input_ids"], attention_mask, position_ids_for(attention_mask)),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "position_ids"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "position_ids": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+            dynamo=False
+        )
+        
+    if model_format == "onnx_int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        
+        quantize_dynamic(fp32_path, onnx_path, weight_type=QuantType.QInt8, use_external_data_format=True)
+        for name in os.listdir(output_dir):
+            if not name.startswith("model.onnx"):
+                os.remove(os.path.join(output_dir, name))
+                
+    tokenizer.save_pretrained(output_dir)
+    
+    # Written last, marks the artifact as complete
+    with open(os.path.join(output_dir, "artifact.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_path": model_path,
+            "format": model_format,
+            "torch_version": torch.__version__,
+            "created": time.time(),
+        }, f, indent=2)
+        
+    logger.info(f"Converted {model_path} to {model_format} in {time.time() - start_time:.1f}s: {output_dir}")
+    return output_dir
+
+
+def load_model(model_path: str, model_format: str = "torch", dtype=None, cache_dir: str = "",
+               threads: int = 0) -> tuple:
+    """Tokenizer and model in `model_format`, ONNX formats are converted on first use"""
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"Unknown model format: {model_format} (available: {', '.join(MODEL_FORMATS)})")
+        
+    set_threads(threads)
+    if model_format == "torch":
+        return load_checkpoint(model_path, dtype)
+    if model_format == "torch_int8":
+        # quantized Linear kernels are CPU only
+        tokenizer, model = load_checkpoint(model_path, torch.float32)
+        return tokenizer, quantize_int8(model)
+        
+    output_dir = artifact_dir(model_path, model_format, cache_dir)
+    if not os.path.exists(os.path.join(output_dir, "artifact.json")):
+        logger.info(f"No cached {model_format} artifact for {model_path}, converting")
+        convert(model_path, model_format, cache_dir, threads)
+        
+    tokenizer = AutoTokenizer.from_pretrained(output_dir, trust_remote_code=True)
+    return tokenizer, OnnxTurnModel(os.path.join(output_dir, "model.onnx"), threads)
+
+
+def main(argv: Optional[list] = None):
+    """Convert and cache an optimized turn detection model"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert the turn detection model for CPU inference")
+    parser.add_argument("--model", default="TEN-framework/TEN_Turn_Detection", help="Model path or hub name")
+    parser.add_argument("--format", nargs="+", default=["onnx_int8"], choices=CACHED_FORMATS,
+                        help="Formats to build")
+    parser.add_argument("--cache-dir", default="", help=f"Artifact cache (default {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads used for conversion")
+    args = parser.parse_args(argv)
+    
+    for model_format in args.format:
+        print(convert(args.model, model_format, args.cache_dir, args.threads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Rule-based turn detector benchmark for TEN Agent
+Usage: python rules_benchmark.py --corpus labelled.jsonl [--repeat 20]
+
+The corpus holds one JSON object per line: {"text": "...", "label":
+"finished" | "unfinished" | "wait"}. Every text is classified with the
+original rule-by-rule loop, the compiled detect() and detect_batch(); the
+report lists throughput, accuracy against the labels and how often the
+compiled engine agrees with the original rules (anything below 100% is a bug).
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+
+from simple_detector import SimpleTurnDetector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_corpus(file_path):
+    """Labelled texts, skipping malformed lines"""
+    corpus = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                corpus.append((item["text"], item["label"]))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"{file_path}:{line_number}: skipping malformed line ({e})")
+    return corpus
+
+
+def time_engine(name, classify_all, texts, labels, repeat):
+    """Classify the corpus `repeat` times, returns the timing and the labels of the last pass"""
+    results = classify_all(texts)  # warm-up, also the predictions
+    start = time.perf_counter()
+    for _ in range(repeat):
+        classify_all(texts)
+    elapsed = time.perf_counter() - start
+    
+    processed = len(texts) * repeat
+    correct = sum(state == label for (state, _), label in zip(results, labels))
+    return {
+        "engine": name,
+        "texts_per_s": round(processed / elapsed, 1) if elapsed > 0 else None,
+        "us_per_text": round(elapsed / processed * 1e6, 3),
+        "accuracy": round(correct / len(texts), 4),
+    }, results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the rule-based turn detector on a labelled corpus")
+    parser.add_argument("--corpus", required=True, help="JSONL file with text and label per line")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed passes over the corpus")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No labelled texts found in {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+        
+    texts = [text for text, _ in corpus]
+    labels = [label for _, label in corpus]
+    detector = SimpleTurnDetector()
+    repeat = max(1, args.repeat)
+    
+    reference, reference_results = time_engine(
+        "reference", lambda batch: [detector.detect_reference(text) for text in batch], texts, labels, repeat
+    )
+    compiled, compiled_results = time_engine(
+        "compiled", lambda batch: [detector.detect(text) for text in batch], texts, labels, repeat
+    )
+    batched, batched_results = time_engine("detect_batch", detector.detect_batch, texts, labels, repeat)
+    results = [reference, compiled, batched]
+    
+    disagreements = []
+    for engine_results, result in ((compiled_results, compiled), (batched_results, batched)):
+        mismatches = [
+            {"text": text, "reference": expected, "got": got}
+            for text, expected, got in zip(texts, reference_results, engine_results) if got != expected
+        ]
+        result["agreement"] = round(1 - len(mismatches) / len(texts), 4)
+        disagreements.extend(mismatches)
+    reference["agreement"] = 1.0
+    
+    print(f"\n{len(texts)} labelled text(s), {repeat} timed pass(es)")
+    print(f"{'engine':<14}{'texts/s':>12}{'us/text':>10}{'speedup':>9}{'accuracy':>10}{'agree':>8}")
+    for result in results:
+        speedup = reference["us_per_text"] / result["us_per_text"] if result["us_per_text"] else 0.0
+        print(f"{result['engine']:<14}{result['texts_per_s'] or 0.0:>12.0f}{result['us_per_text']:>10.2f}"
+              f"{speedup:>8.2f}x{result['accuracy']:>10.1%}{result['agreement']:>8.1%}")
+              
+    for mismatch in disagreements[:10]:
+        logger.warning(f"Disagreement on {mismatch['text']!r}: {mismatch['got']} != {mismatch['reference']}")
+        
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "disagreements": disagreements}, f, indent=2)
+            
+    if disagreements:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
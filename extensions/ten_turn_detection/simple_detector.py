@@ -0,0 +1,112 @@
+"""
+Rule-based turn detection, used when the TEN Turn Detection model is unavailable
+
+Kept free of framework and torch imports so rules_benchmark.py can run it
+on its own.
+"""
+
+import re
+from typing import List
+
+
+class SimpleTurnDetector:
+    """Simple rule-based turn detection fallback"""
+    
+    # The unfinished rules are end-anchored and match the last word at most
+    tail_length = 32
+    
+    def __init__(self):
+        # Common turn-ending patterns
+        self.end_patterns = [
+            r'\?$',  # Questions
+            r'\.$',  # Statements ending with period
+            r'!$',   # Exclamations
+            r'thanks?\b',  # Thanks
+            r'\bbye\b|\bgoodbye\b',  # Goodbyes
+            r'\bok\b|\bokay\b|\balright\b',  # Confirmations
+        ]
+        
+        # Wait/stop patterns
+        self.wait_patterns = [
+            r'\bstop\b|\bwait\b|\bhold\b',
+            r'\bshut up\b|\bstop talking\b',
+            r'\bquiet\b|\bsilence\b',
+        ]
+        
+        # Unfinished patterns
+        self.unfinished_patterns = [
+            r'\band\s*$',  # Ending with "and"
+            r'\bbut\s*$',  # Ending with "but"
+            r'\bso\s*$',   # Ending with "so"
+            r',\s*$',      # Ending with comma
+            r'\bi\s*$',    # Just "I"
+            r'\bthe\s*$',  # Just "the"
+            r'\ba\s*$',    # Just "a"
+        ]
+        
+        self.compile()
+        
+    def compile(self) -> None:
+        """Fold each rule group into one precompiled alternation, call again after editing the lists"""
+        self.wait_regex = re.compile("|".join(self.wait_patterns), re.IGNORECASE)
+        self.unfinished_regex = re.compile("|".join(self.unfinished_patterns), re.IGNORECASE)
+        self.end_regex = re.compile("|".join(self.end_patterns), re.IGNORECASE)
+        
+    def detect(self, text: str) -> tuple:
+        """Detect turn state: finished, unfinished, or wait"""
+        text = text.strip().lower()
+        
+        if not text:
+            return "unfinished", 0.1
+            
+        # Same priority as detect_reference(): wait anywhere, unfinished on the
+        # tail only, then finished; each group is a single scan
+        if self.wait_regex.search(text):
+            return "wait", 0.9
+            
+        if self.unfinished_regex.search(text, max(0, len(text) - self.tail_length)):
+            return "unfinished", 0.8
+            
+        if self.end_regex.search(text):
+            return "finished", 0.9
+            
+        # Default: if text is short and doesn't match patterns, likely unfinished
+        if len(text.split()) < 3:
+            return "unfinished", 0.6
+            
+        # Longer text without clear ending, moderate confidence it's finished
+        return "finished", 0.7
+        
+    def detect_batch(self, texts: List[str]) -> List[tuple]:
+        """detect() for many texts, e.g. every partial transcript of a session at once"""
+        detect = self.detect
+        return [detect(text) for text in texts]
+        
+    def detect_reference(self, text: str) -> tuple:
+        """Rule-by-rule evaluation, the behaviour detect() must reproduce"""
+        text = text.strip().lower()
+        
+        if not text:
+            return "unfinished", 0.1
+            
+        # Check for wait patterns first
+        for pattern in self.wait_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return "wait", 0.9
+                
+        # Check for unfinished patterns
+        for pattern in self.unfinished_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return "unfinished", 0.8
+                
+        # Check for finished patterns
+        for pattern in self.end_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return "finished", 0.9
+                
+        # Default: if text is short and doesn't match patterns, likely unfinished
+        if len(text.split()) < 3:
+            return "unfinished", 0.6
+            
+        # Longer text without clear ending, moderate confidence it's finished
+        return "finished", 0.7
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+VAD engine benchmark for TEN Agent
+Usage: python benchmark.py [--audio clip.wav] [--model silero_vad.onnx] [--streams 32]
+
+Reports microseconds of engine time per hop for SimpleVAD and, when a model
+is given, the ONNX Runtime engine: once for a single stream fed in 20 ms
+frames, and once for many streams scored together by MultiStreamVAD. Hop
+sizes differ between engines (160 samples for SimpleVAD, one model window
+for ONNX), so the table also lists microseconds per second of audio.
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from offline import read_wav
+from vad_core import AudioReframer, MultiStreamVAD, create_vad_engine, score_hops
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_audio(seconds, sample_rate):
+    """Noise with tone bursts, for runs without a recording"""
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 300, int(seconds * sample_rate))
+    t = np.arange(sample_rate) / sample_rate
+    for start in range(0, len(audio) - sample_rate, 3 * sample_rate):
+        audio[start:start + sample_rate] += 8000 * np.sin(2 * np.pi * 220 * t)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def benchmark_single(engine_args, audio, sample_rate, frame_ms=20):
+    """One stream, frames pushed and scored as they would arrive live"""
+    engine = create_vad_engine(*engine_args)
+    frame_size = getattr(engine, "frame_size", engine_args[2])
+    reframer = AudioReframer(frame_size, sample_rate)
+    step = sample_rate * frame_ms // 1000
+    
+    hops = 0
+    start = time.perf_counter()
+    for i in range(0, len(audio), step):
+        _, frame_hops = reframer.push(audio[i:i + step])
+        if len(frame_hops):
+            score_hops(engine, frame_hops)
+            hops += len(frame_hops)
+    elapsed = time.perf_counter() - start
+    
+    return elapsed, hops, len(audio)
+
+
+def benchmark_multi(engine_args, audio, sample_rate, streams, frame_ms=20):
+    """Many streams, one tick per frame interval"""
+    vad = MultiStreamVAD(engine_args[0], sample_rate, engine_args[2], engine=engine_args[3],
+                         model_path=engine_args[4], intra_op_threads=engine_args[5],
+                         inter_op_threads=engine_args[6])
+    for stream_id in range(streams):
+        vad.add_stream(stream_id)
+        
+    step = sample_rate * frame_ms // 1000
+    start = time.perf_counter()
+    for i in range(0, len(audio), step):
+        frame = audio[i:i + step]
+        for stream_id in range(streams):
+            vad.push(stream_id, frame)
+        vad.tick()
+    elapsed = time.perf_counter() - start
+    
+    return elapsed, vad.stats()["hops_scored"], len(audio) * streams
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Measure VAD engine cost per hop")
+    parser.add_argument("--audio", help="16-bit PCM WAV file (synthetic audio when omitted)")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Length of the synthetic audio")
+    parser.add_argument("--model", help="ONNX VAD model (Silero-compatible) to compare")
+    parser.add_argument("--streams", type=int, default=32, help="Concurrent streams for the multi-stream run")
+    parser.add_argument("--intra-op-threads", type=int, default=1, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--inter-op-threads", type=int, default=1, help="ONNX Runtime inter-op threads")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+    
+    sample_rate = 16000
+    if args.audio:
+        audio, input_rate, channels = read_wav(args.audio)
+        audio = AudioReframer(1, sample_rate).push(audio, input_rate, channels)[1].reshape(-1)
+    else:
+        audio = synthetic_audio(args.seconds, sample_rate)
+        
+    engines = [("simple", "")]
+    if args.model:
+        engines.append(("onnx", args.model))
+        
+    results = []
+    for engine, model_path in engines:
+        engine_args = (0.5, sample_rate, 160, engine, model_path, args.intra_op_threads, args.inter_op_threads)
+        try:
+            runs = [("1 stream", benchmark_single(engine_args, audio, sample_rate)),
+                    (f"{args.streams} streams", benchmark_multi(engine_args, audio, sample_rate, args.streams))]
+        except ImportError as e:
+            logger.warning(f"Skipping {engine}: {e}")
+            continue
+            
+        for mode, (elapsed, hops, samples) in runs:
+            results.append({
+                "engine": engine,
+                "mode": mode,
+                "hops": hops,
+                "us_per_hop": round(elapsed * 1e6 / hops, 2) if hops else None,
+                "us_per_audio_second": round(elapsed * 1e6 / (samples / sample_rate), 1),
+            })
+            
+    print(f"\n{len(audio) / sample_rate:.1f}s of audio")
+    print(f"{'engine':<10}{'mode':<14}{'hops':>10}{'us/hop':>10}{'us/audio s':>12}")
+    for result in results:
+        print(f"{result['engine']:<10}{result['mode']:<14}{result['hops']:>10}"
+              f"{result['us_per_hop'] or 0.0:>10.2f}{result['us_per_audio_second']:>12.1f}")
+              
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            
+    if not results:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,50 +14,28 @@ from ten import (
 )
 import numpy as np
 import threading
-import time
 import logging
-from typing import Optional
+import json
 import sys
 import os
+from collections import deque
+from typing import Optional
 
-# Add the path to include directory for TEN VAD
-sys.path.append(os.path.join(os.path.dirname(__file__), '../../include'))
-
-# Try to import TEN VAD - fallback to simple threshold-based VAD if not available
-try:
-    import ten_vad
-    TEN_VAD_AVAILABLE = True
-except ImportError:
-    TEN_VAD_AVAILABLE = False
-    import struct
+# VAD core lives next to this file so offline.py can share it
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from vad_core import (
+    TEN_VAD_AVAILABLE,
+    AudioReframer,
+    VADStateMachine,
+    create_vad_engine,
+    get_shared_vad,
+    release_shared_vad,
+    score_hops,
+)
 
 logger = logging.getLogger(__name__)
 
 
-class SimpleVAD:
-    """Simple threshold-based VAD fallback"""
-    
-    def __init__(self, threshold=0.5, sample_rate=16000, frame_size=160):
-        self.threshold = threshold
-        self.sample_rate = sample_rate
-        self.frame_size = frame_size
-        
-    def process(self, audio_data):
-        """Process audio and return VAD result"""
-        # Convert to float if needed
-        if audio_data.dtype == np.int16:
-            audio_data = audio_data.astype(np.float32) / 32768.0
-            
-        # Calculate RMS energy
-        rms = np.sqrt(np.mean(audio_data ** 2))
-        
-        # Simple threshold-based detection
-        is_speech = rms > self.threshold
-        confidence = min(rms / self.threshold, 1.0) if is_speech else 0.0
-        
-        return is_speech, confidence
-
-
 class TenVADExtension(Extension):
     """TEN VAD Extension for real-time voice activity detection"""
     
@@ -70,10 +48,43 @@ class TenVADExtension(Extension):
         self.min_silence_duration = 0.3  # seconds
         self.min_speech_duration = 0.1   # seconds
         
-        # State tracking
-        self.current_state = False  # False = silence, True = speech
-        self.state_start_time = time.time()
-        self.last_detection_time = time.time()
+        # Engine: "auto" (TEN VAD, else SimpleVAD), "ten_vad", "onnx" or "simple"
+        self.engine = "auto"
+        self.model_path = ""  # ONNX model for the onnx engine
+        self.intra_op_threads = 1
+        self.inter_op_threads = 1
+        self.reframer = AudioReframer(self.frame_size, self.sample_rate)
+        
+        # Output: "events" sends speech_start / speech_end only, "frames" one result per frame
+        self.output_mode = "events"
+        self.heartbeat_interval = 0.0  # seconds, 0 disables heartbeats
+        self.last_heartbeat_sample = 0
+        self.heartbeat_hops = 0
+        self.heartbeat_speech_hops = 0
+        self.heartbeat_confidence_sum = 0.0
+        self.heartbeat_confidence_max = 0.0
+        
+        # State tracking on the per-stream sample clock
+        self.state_machine = VADStateMachine(self.sample_rate, self.min_silence_duration, self.min_speech_duration)
+        
+        # Multi-stream mode hands frames to one process-wide engine scored per tick
+        self.multi_stream = False
+        self.tick_interval = 0.02  # seconds
+        self.shared_vad = None
+        self.stream_id = f"{name}-{id(self)}"
+        
+        # Gated forwarding: audio goes downstream only during speech, plus pre-roll and hangover
+        self.forward_audio = False
+        self.pre_roll_duration = 0.5  # seconds, must cover the speech_start decision delay
+        self.hangover_duration = 0.3  # seconds of audio still forwarded after speech_end
+        self.pre_roll = deque()  # (bytes, sample_rate, channels, samples at VAD rate)
+        self.pre_roll_samples = 0
+        self.gate_speech = False
+        self.speech_end_sample: Optional[int] = None  # None until the first speech_end
+        self.forward_position = 0  # stream position at the VAD rate
+        self.forwarded_frames = 0
+        self.dropped_frames = 0
+        self.gate_lock = threading.Lock()
         
         # Threading
         self.lock = threading.Lock()
@@ -90,9 +101,31 @@ class TenVADExtension(Extension):
             self.frame_size = ten_env.get_property_int("frame_size") or 160
             self.min_silence_duration = ten_env.get_property_float("min_silence_duration") or 0.3
             self.min_speech_duration = ten_env.get_property_float("min_speech_duration") or 0.1
+            self.output_mode = ten_env.get_property_string("output_mode") or "events"
+            self.heartbeat_interval = ten_env.get_property_float("heartbeat_interval") or 0.0
+            self.engine = ten_env.get_property_string("engine") or "auto"
+            self.model_path = ten_env.get_property_string("model_path") or ""
+            self.intra_op_threads = ten_env.get_property_int("intra_op_threads") or 1
+            self.inter_op_threads = ten_env.get_property_int("inter_op_threads") or 1
+            self.multi_stream = ten_env.get_property_bool("multi_stream") or False
+            self.tick_interval = ten_env.get_property_float("tick_interval") or 0.02
+            self.forward_audio = ten_env.get_property_bool("forward_audio") or False
+            self.pre_roll_duration = ten_env.get_property_float("pre_roll_duration") or 0.5
+            self.hangover_duration = ten_env.get_property_float("hangover_duration") or 0.3
+            if self.output_mode not in ("events", "frames"):
+                logger.warning(f"Unknown output mode {self.output_mode}, using events")
+                self.output_mode = "events"
+            if self.multi_stream and (self.output_mode != "events" or self.heartbeat_interval > 0):
+                logger.warning("Multi-stream VAD only sends speech_start / speech_end events")
+                self.output_mode = "events"
+                self.heartbeat_interval = 0.0
             
-            logger.info(f"Configured VAD - threshold: {self.threshold}, sample_rate: {self.sample_rate}")
+            logger.info(f"Configured VAD - engine: {self.engine}, threshold: {self.threshold}, sample_rate: {self.sample_rate}")
             logger.info(f"Frame size: {self.frame_size}, min_silence: {self.min_silence_duration}s")
+            logger.info(f"Output mode: {self.output_mode}, heartbeat: {self.heartbeat_interval}s")
+            if self.forward_audio:
+                logger.info(f"Forwarding speech audio - pre-roll: {self.pre_roll_duration}s, "
+                            f"hangover: {self.hangover_duration}s")
             
             ten_env.on_configure_done()
             
@@ -106,20 +139,35 @@ class TenVADExtension(Extension):
         
         try:
             # Initialize VAD engine
-            if TEN_VAD_AVAILABLE:
+            try:
+                self._create_engine()
+            except Exception as e:
+                if self.engine == "auto":
+                    raise
+                logger.warning(f"VAD engine {self.engine} unavailable ({e}), falling back to auto")
+                self.engine = "auto"
+                self._create_engine()
+                
+            if self.engine == "onnx":
+                logger.info(f"Using ONNX VAD engine, hop size {self.frame_size} samples")
+            elif self.engine == "simple":
+                logger.info("Using simple threshold-based VAD")
+            elif TEN_VAD_AVAILABLE:
                 logger.info("Using TEN VAD engine")
-                self.vad_engine = ten_vad.TenVAD(
-                    sample_rate=self.sample_rate,
-                    frame_size=self.frame_size
-                )
             else:
                 logger.info("TEN VAD not available, using simple threshold-based VAD")
-                self.vad_engine = SimpleVAD(
-                    threshold=self.threshold,
-                    sample_rate=self.sample_rate,
-                    frame_size=self.frame_size
+                
+            if self.shared_vad:
+                self.shared_vad.add_stream(
+                    self.stream_id,
+                    lambda stream_id, event, sample_index, confidence: self._on_shared_event(
+                        ten_env, event, sample_index, confidence
+                    )
                 )
-            
+                logger.info(f"Joined multi-stream VAD ({self.shared_vad.stats()['streams']} streams)")
+                
+            self.reframer = AudioReframer(self.frame_size, self.sample_rate)
+            self.state_machine = VADStateMachine(self.sample_rate, self.min_silence_duration, self.min_speech_duration)
             self.running = True
             logger.info("VAD engine initialized successfully")
             
@@ -129,12 +177,31 @@ class TenVADExtension(Extension):
             logger.error(f"Failed to start VAD: {e}")
             ten_env.on_start_done()
             
+    def _create_engine(self) -> None:
+        """Create the VAD engine, or join the shared multi-stream engine"""
+        engine_options = (self.engine, self.model_path, self.intra_op_threads, self.inter_op_threads)
+        if self.multi_stream:
+            self.shared_vad = get_shared_vad(
+                self.threshold, self.sample_rate, self.frame_size,
+                self.min_silence_duration, self.min_speech_duration, self.tick_interval,
+                *engine_options
+            )
+            self.vad_engine = self.shared_vad.vad_engine
+        else:
+            self.vad_engine = create_vad_engine(self.threshold, self.sample_rate, self.frame_size, *engine_options)
+            
+        # Model-based engines dictate the hop size
+        self.frame_size = getattr(self.vad_engine, "frame_size", self.frame_size)
+        
     def on_stop(self, ten_env: TenEnv) -> None:
         """Stop extension"""
         logger.info("TEN VAD: on_stop")
         
         try:
             self.running = False
+            if self.shared_vad:
+                release_shared_vad(self.shared_vad, self.stream_id)
+                self.shared_vad = None
             ten_env.on_stop_done()
             
         except Exception as e:
@@ -154,59 +221,166 @@ class TenVADExtension(Extension):
                 # Convert to numpy array
                 audio_data = np.frombuffer(audio_frame.get_data(), dtype=np.int16)
                 
+                sample_rate = audio_frame.get_sample_rate() or self.sample_rate
+                channels = audio_frame.get_number_of_channels() or 1
+                
                 # Process with VAD
-                self._process_vad(ten_env, audio_data)
+                self._process_vad(ten_env, audio_data, sample_rate, channels)
+                
+                if self.forward_audio:
+                    self._gate_audio(ten_env, audio_frame.get_data(), sample_rate, channels)
                     
         except Exception as e:
             logger.error(f"Error handling audio data in VAD: {e}")
             
-    def _process_vad(self, ten_env: TenEnv, audio_data: np.ndarray) -> None:
+    def _process_vad(self, ten_env: TenEnv, audio_data: np.ndarray, sample_rate: int = 16000,
+                     channels: int = 1) -> None:
         """Process audio with VAD and send results"""
+        if self.shared_vad:
+            # Scored with every other stream on the next tick
+            self.shared_vad.push(self.stream_id, audio_data, sample_rate, channels)
+            return
+            
         try:
             with self.lock:
-                current_time = time.time()
-                
-                # Run VAD detection
-                if TEN_VAD_AVAILABLE:
-                    # Use TEN VAD engine
-                    is_speech, confidence = self.vad_engine.process(audio_data)
-                else:
-                    # Use simple VAD fallback
-                    is_speech, confidence = self.vad_engine.process(audio_data)
-                
-                # Apply temporal smoothing to avoid rapid state changes
-                state_changed = False
-                
-                if is_speech != self.current_state:
-                    state_duration = current_time - self.state_start_time
+                # Split into exact hops at the VAD sample rate
+                offsets, hops = self.reframer.push(audio_data, sample_rate, channels)
+                if len(hops) == 0:
+                    return
                     
-                    # Check minimum duration requirements
-                    if self.current_state and state_duration >= self.min_speech_duration:
-                        # Was speech, now silence - require minimum speech duration
-                        self.current_state = False
-                        self.state_start_time = current_time
-                        state_changed = True
-                    elif not self.current_state and state_duration >= self.min_silence_duration:
-                        # Was silence, now speech - require minimum silence duration
-                        self.current_state = True
-                        self.state_start_time = current_time
-                        state_changed = True
-                else:
-                    # State hasn't changed, update start time
-                    if is_speech == self.current_state:
-                        self.state_start_time = current_time
+                # Run VAD detection on every complete hop at once
+                hop_speech, hop_confidence = score_hops(self.vad_engine, hops)
                 
-                # Always send VAD results for real-time processing
-                self._send_vad_result(ten_env, self.current_state, confidence, int(current_time * 1000))
+                # Each decision is taken at the end of its hop on the stream sample clock
+                hop_ends = offsets + self.frame_size
                 
-                # Log state changes
-                if state_changed:
-                    logger.info(f"VAD state change: {'SPEECH' if self.current_state else 'SILENCE'} (confidence: {confidence:.3f})")
+                for hop_end, is_speech, confidence in zip(hop_ends, hop_speech, hop_confidence):
+                    if not self._update_state(bool(is_speech), float(confidence), int(hop_end)):
+                        continue
+                    event = "speech_start" if self.state_machine.current_state else "speech_end"
+                    self._note_event(event, int(hop_end))
+                    if self.output_mode == "events":
+                        self._send_vad_result(ten_env, self.state_machine.current_state, float(confidence),
+                                              self._to_ms(hop_end), event)
+                        
+                if self.output_mode == "frames":
+                    # Per-frame stream for consumers that want every decision
+                    self._send_vad_result(ten_env, self.state_machine.current_state, float(hop_confidence[-1]),
+                                          self._to_ms(hop_ends[-1]))
+                elif self.heartbeat_interval > 0:
+                    self._accumulate_heartbeat(ten_env, hop_speech, hop_confidence, int(hop_ends[-1]))
                     
         except Exception as e:
             logger.error(f"Error processing VAD: {e}")
             
-    def _send_vad_result(self, ten_env: TenEnv, is_speech: bool, confidence: float, timestamp: int) -> None:
+    def _on_shared_event(self, ten_env: TenEnv, event: str, sample_index: int, confidence: float) -> None:
+        """State change reported by the multi-stream engine"""
+        is_speech = event == "speech_start"
+        self._note_event(event, sample_index)
+        logger.info(f"VAD state change: {'SPEECH' if is_speech else 'SILENCE'} (confidence: {confidence:.3f})")
+        self._send_vad_result(ten_env, is_speech, confidence, self._to_ms(sample_index), event)
+        
+    def _note_event(self, event: str, sample_index: int) -> None:
+        """Track speech state for the forwarding gate"""
+        with self.gate_lock:
+            self.gate_speech = event == "speech_start"
+            if not self.gate_speech:
+                self.speech_end_sample = sample_index
+                
+    def _gate_audio(self, ten_env: TenEnv, frame_bytes: bytes, sample_rate: int, channels: int) -> None:
+        """Forward the frame while speech (or its hangover) is active, otherwise keep it as pre-roll"""
+        samples = len(frame_bytes) // (2 * channels) * self.sample_rate // sample_rate
+        
+        with self.gate_lock:
+            self.forward_position += samples
+            in_hangover = (self.speech_end_sample is not None and
+                           self.forward_position <= self.speech_end_sample + self.hangover_duration * self.sample_rate)
+            if not self.gate_speech and not in_hangover:
+                # Silence: keep the most recent audio for the next onset
+                self.pre_roll.append((frame_bytes, sample_rate, channels, samples))
+                self.pre_roll_samples += samples
+                while self.pre_roll and self.pre_roll_samples - self.pre_roll[0][3] >= self.pre_roll_duration * self.sample_rate:
+                    self.pre_roll_samples -= self.pre_roll.popleft()[3]
+                    self.dropped_frames += 1
+                return
+                
+            # Speech onset releases the buffered pre-roll ahead of the live frame
+            frames = list(self.pre_roll)
+            frames.append((frame_bytes, sample_rate, channels, samples))
+            self.pre_roll.clear()
+            self.pre_roll_samples = 0
+            self.forwarded_frames += len(frames)
+            
+        for frame_bytes, sample_rate, channels, _ in frames:
+            self._send_audio_frame(ten_env, frame_bytes, sample_rate, channels)
+            
+    def _send_audio_frame(self, ten_env: TenEnv, frame_bytes: bytes, sample_rate: int, channels: int) -> None:
+        """Send an audio frame to the next extension"""
+        try:
+            audio_frame = AudioFrame.create("audio_frame")
+            audio_frame.set_data(frame_bytes)
+            audio_frame.set_sample_rate(sample_rate)
+            audio_frame.set_number_of_channels(channels)
+            ten_env.send_data(audio_frame.to_data())
+            
+        except Exception as e:
+            logger.error(f"Error forwarding audio frame: {e}")
+            
+    def _reset_gate(self) -> None:
+        with self.gate_lock:
+            self.pre_roll.clear()
+            self.pre_roll_samples = 0
+            self.gate_speech = False
+            self.speech_end_sample = None
+            self.forward_position = 0
+            
+    def _to_ms(self, sample_index: int) -> int:
+        """Stream time in milliseconds for a sample position"""
+        return int(sample_index) * 1000 // self.sample_rate
+        
+    def _accumulate_heartbeat(self, ten_env: TenEnv, hop_speech: np.ndarray, hop_confidence: np.ndarray,
+                              sample_index: int) -> None:
+        """Aggregate confidence statistics and send them every `heartbeat_interval`"""
+        self.heartbeat_hops += len(hop_speech)
+        self.heartbeat_speech_hops += int(np.count_nonzero(hop_speech))
+        self.heartbeat_confidence_sum += float(np.sum(hop_confidence))
+        self.heartbeat_confidence_max = max(self.heartbeat_confidence_max, float(np.max(hop_confidence)))
+        
+        if sample_index - self.last_heartbeat_sample < self.heartbeat_interval * self.sample_rate:
+            return
+            
+        try:
+            output_data = Data.create("vad_result")
+            output_data.set_property_bool("is_speech", self.state_machine.current_state)
+            output_data.set_property_float("confidence", self.heartbeat_confidence_sum / self.heartbeat_hops)
+            output_data.set_property_float("max_confidence", self.heartbeat_confidence_max)
+            output_data.set_property_float("speech_ratio", self.heartbeat_speech_hops / self.heartbeat_hops)
+            output_data.set_property_int("timestamp", self._to_ms(sample_index))
+            output_data.set_property_string("event", "heartbeat")
+            ten_env.send_data(output_data)
+            
+        except Exception as e:
+            logger.error(f"Error sending VAD heartbeat: {e}")
+            
+        self.last_heartbeat_sample = sample_index
+        self.heartbeat_hops = 0
+        self.heartbeat_speech_hops = 0
+        self.heartbeat_confidence_sum = 0.0
+        self.heartbeat_confidence_max = 0.0
+        
+    def _update_state(self, is_speech: bool, confidence: float, sample_index: int) -> bool:
+        """Advance the hysteresis state machine by one hop, returns True on a state change"""
+        # Apply temporal smoothing to avoid rapid state changes
+        state_changed = self.state_machine.update(is_speech, sample_index)
+        
+        # Log state changes
+        if state_changed:
+            logger.info(f"VAD state change: {'SPEECH' if self.state_machine.current_state else 'SILENCE'} (confidence: {confidence:.3f})")
+            
+        return state_changed
+        
+    def _send_vad_result(self, ten_env: TenEnv, is_speech: bool, confidence: float, timestamp: int,
+                         event: str = "frame") -> None:
         """Send VAD result to next extension"""
         try:
             # Create output data
@@ -214,6 +388,7 @@ class TenVADExtension(Extension):
             output_data.set_property_bool("is_speech", is_speech)
             output_data.set_property_float("confidence", confidence)
             output_data.set_property_int("timestamp", timestamp)
+            output_data.set_property_string("event", event)
             
             # Send to next extension
             ten_env.send_data(output_data)
@@ -228,16 +403,38 @@ class TenVADExtension(Extension):
         if cmd_name == "reset":
             # Reset VAD state
             with self.lock:
-                self.current_state = False
-                self.state_start_time = time.time()
-                
+                self.state_machine.reset()
+                self.reframer.reset()
+                self.last_heartbeat_sample = 0
+                if self.shared_vad:
+                    self.shared_vad.reset_stream(self.stream_id)
+            self._reset_gate()
+            
             result = CmdResult.create(StatusCode.OK)
             result.set_property_string("message", "VAD state reset")
             ten_env.return_result(result, cmd)
             
+        elif cmd_name == "get_stats":
+            with self.gate_lock:
+                stats = {
+                    "is_speech": self.gate_speech,
+                    "forwarded_frames": self.forwarded_frames,
+                    "dropped_frames": self.dropped_frames,
+                    "pre_roll_seconds": self.pre_roll_samples / self.sample_rate,
+                }
+            if self.shared_vad:
+                stats["multi_stream"] = self.shared_vad.stats()
+                
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("stats", json.dumps(stats))
+            ten_env.return_result(result, cmd)
+            
         elif cmd_name == "set_threshold":
             # Update threshold
             try:
+                if self.shared_vad:
+                    raise ValueError("threshold is shared by all streams in multi-stream mode")
+                    
                 new_threshold = cmd.get_property_float("threshold")
                 self.threshold = new_threshold
                 
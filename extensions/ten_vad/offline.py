@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Offline VAD replay for TEN Agent
+Usage: python offline.py <audio_file.wav> [more.wav ...] [--output segments.json]
+
+Runs recordings through the same re-framing, scoring and hysteresis as the
+TEN VAD extension, driven by the sample clock instead of wall time, so a
+file is segmented exactly as it would be live but much faster than real time.
+"""
+
+import sys
+import json
+import time
+import wave
+import argparse
+import logging
+
+import numpy as np
+
+from vad_core import VAD_ENGINES, AudioReframer, VADStateMachine, create_vad_engine, score_hops
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_wav(file_path):
+    """Read a 16-bit PCM WAV file, returns (samples, sample_rate, channels)"""
+    with wave.open(file_path, "rb") as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError(f"{file_path}: only 16-bit PCM WAV files are supported")
+        frames = wav_file.readframes(wav_file.getnframes())
+        return np.frombuffer(frames, dtype=np.int16), wav_file.getframerate(), wav_file.getnchannels()
+
+
+def segment_file(file_path, threshold, sample_rate, frame_size, min_silence, min_speech, engine="auto",
+                 model_path=""):
+    """Replay one file through the VAD and return its speech segments"""
+    audio, input_rate, channels = read_wav(file_path)
+    
+    start_time = time.time()
+    vad_engine = create_vad_engine(threshold, sample_rate, frame_size, engine, model_path)
+    frame_size = getattr(vad_engine, "frame_size", frame_size)
+    reframer = AudioReframer(frame_size, sample_rate)
+    state_machine = VADStateMachine(sample_rate, min_silence, min_speech)
+    
+    offsets, hops = reframer.push(audio, input_rate, channels)
+    segments = []
+    speech_start = None
+    
+    if len(hops):
+        hop_speech, _ = score_hops(vad_engine, hops)
+        for hop_end, is_speech in zip(offsets + frame_size, hop_speech):
+            if not state_machine.update(bool(is_speech), int(hop_end)):
+                continue
+            if state_machine.current_state:
+                speech_start = state_machine.transition_sample
+            else:
+                segments.append((speech_start, state_machine.transition_sample))
+                speech_start = None
+                
+    # Close a segment that is still open at the end of the file
+    end_sample = reframer.next_offset
+    if speech_start is not None:
+        segments.append((speech_start, end_sample))
+        
+    processing_time = time.time() - start_time
+    duration = end_sample / sample_rate
+    
+    return {
+        "file": file_path,
+        "duration": round(duration, 3),
+        "segments": [
+            {"start": round(start / sample_rate, 3), "end": round(end / sample_rate, 3)}
+            for start, end in segments
+        ],
+        "processing_time": round(processing_time, 4),
+        "speed_factor": round(duration / processing_time, 1) if processing_time > 0 else None,
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Segment WAV files with the TEN VAD pipeline")
+    parser.add_argument("audio_files", nargs="+", help="16-bit PCM WAV files to segment")
+    parser.add_argument("--engine", default="auto", choices=VAD_ENGINES, help="VAD engine")
+    parser.add_argument("--model", default="", help="ONNX model for the onnx engine")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Speech threshold for the fallback VAD")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="VAD sample rate")
+    parser.add_argument("--frame-size", type=int, default=160, help="Hop size in samples")
+    parser.add_argument("--min-silence", type=float, default=0.3, help="Minimum silence before speech (seconds)")
+    parser.add_argument("--min-speech", type=float, default=0.1, help="Minimum speech before silence (seconds)")
+    parser.add_argument("--output", help="Write results as JSON instead of printing them")
+    args = parser.parse_args()
+    
+    results = []
+    for file_path in args.audio_files:
+        try:
+            results.append(segment_file(
+                file_path, args.threshold, args.sample_rate, args.frame_size,
+                args.min_silence, args.min_speech, args.engine, args.model
+            ))
+        except (OSError, ValueError, wave.Error) as e:
+            logger.error(f"Failed to process {file_path}: {e}")
+            
+    for result in results:
+        logger.info(f"{result['file']}: {len(result['segments'])} segment(s), "
+                    f"{result['duration']}s of audio in {result['processing_time']}s "
+                    f"({result['speed_factor']}x real time)")
+                    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+        
+    if len(results) < len(args.audio_files):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,602 @@
+"""
+Voice activity detection core shared by the TEN VAD extension and offline tools
+
+Everything here runs on a per-stream sample clock and has no dependency on the
+TEN runtime, so the same engine and state machine can replay recordings
+faster than real time.
+"""
+
+import numpy as np
+import threading
+import logging
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import sys
+import os
+
+# Add the path to include directory for TEN VAD
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../include'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../common'))
+from resampling import StreamingResampler
+
+# Try to import TEN VAD - fallback to simple threshold-based VAD if not available
+try:
+    import ten_vad
+    TEN_VAD_AVAILABLE = True
+except ImportError:
+    TEN_VAD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+VAD_ENGINES = ("auto", "ten_vad", "onnx", "simple")
+
+
+class SimpleVAD:
+    """Simple threshold-based VAD fallback"""
+    
+    def __init__(self, threshold=0.5, sample_rate=16000, frame_size=160):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        
+    def process(self, audio_data):
+        """Process audio and return VAD result"""
+        # Convert to float if needed
+        if audio_data.dtype == np.int16:
+            audio_data = audio_data.astype(np.float32) / 32768.0
+            
+        # Calculate RMS energy
+        rms = np.sqrt(np.mean(audio_data ** 2))
+        
+        # Simple threshold-based detection
+        is_speech = rms > self.threshold
+        confidence = min(rms / self.threshold, 1.0) if is_speech else 0.0
+        
+        return is_speech, confidence
+        
+    def process_hops(self, hops):
+        """Score a (num_hops, frame_size) int16 array in one vectorized pass"""
+        audio = hops.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(audio ** 2, axis=1))
+        
+        is_speech = rms > self.threshold
+        confidence = np.where(is_speech, np.minimum(rms / self.threshold, 1.0), 0.0)
+        
+        return is_speech, confidence
+
+
+class OnnxVAD:
+    """Neural VAD run through ONNX Runtime on CPU
+    
+    Expects a Silero-style recurrent model: inputs `input` (batch, context +
+    window) float32, `state` (2, batch, 128) and `sr`; outputs the speech
+    probability and the next state. Hops must be exactly one model window
+    (512 samples at 16 kHz, 256 at 8 kHz). The recurrent state and the
+    trailing context carry over from one call to the next, and `infer`
+    scores one window for a whole batch of streams in a single run.
+    """
+    
+    WINDOW_SIZES = {16000: 512, 8000: 256}
+    recurrent = True
+    
+    def __init__(self, model_path: str, threshold: float = 0.5, sample_rate: int = 16000,
+                 intra_op_threads: int = 1, inter_op_threads: int = 1):
+        if sample_rate not in self.WINDOW_SIZES:
+            raise ValueError(f"ONNX VAD supports {sorted(self.WINDOW_SIZES)} Hz, not {sample_rate}")
+            
+        self.session = get_onnx_session(model_path, intra_op_threads, inter_op_threads)
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.frame_size = self.WINDOW_SIZES[sample_rate]
+        self.context_size = 64 if sample_rate == 16000 else 32
+        self.state_size = 128
+        self._sr = np.array(sample_rate, dtype=np.int64)
+        self.reset()
+        
+    def reset(self) -> None:
+        """Forget the recurrent state of the single-stream API"""
+        self.state, self.context = self.initial_state(1)
+        
+    def initial_state(self, batch_size: int) -> tuple:
+        """Zero (state, context) for `batch_size` streams"""
+        return (np.zeros((2, batch_size, self.state_size), dtype=np.float32),
+                np.zeros((batch_size, self.context_size), dtype=np.float32))
+                
+    def infer(self, windows: np.ndarray, state: np.ndarray, context: np.ndarray) -> tuple:
+        """One step for a batch of streams, returns (probabilities, state, context)"""
+        if windows.dtype == np.int16:
+            windows = windows.astype(np.float32) / 32768.0
+            
+        model_input = np.concatenate((context, windows), axis=1)
+        output, state = self.session.run(None, {"input": model_input, "state": state, "sr": self._sr})
+        return output[:, 0], state, model_input[:, -self.context_size:]
+        
+    def process_hops(self, hops):
+        """Score consecutive hops of one stream, carrying the state between them"""
+        confidence = np.zeros(len(hops), dtype=np.float32)
+        for i, hop in enumerate(hops):
+            probability, self.state, self.context = self.infer(hop[np.newaxis], self.state, self.context)
+            confidence[i] = probability[0]
+            
+        return confidence > self.threshold, confidence
+        
+    def process(self, audio_data):
+        """Process audio and return VAD result"""
+        is_speech, confidence = self.process_hops(np.asarray(audio_data).reshape(1, -1))
+        return bool(is_speech[0]), float(confidence[0])
+
+
+# ONNX sessions are thread-safe, so every engine with the same model and threading shares one
+_onnx_sessions: Dict[tuple, object] = {}
+_onnx_sessions_lock = threading.Lock()
+
+
+def get_onnx_session(model_path: str, intra_op_threads: int = 1, inter_op_threads: int = 1):
+    """Create (once) the ONNX Runtime session for a model"""
+    import onnxruntime
+    
+    key = (os.path.abspath(model_path), intra_op_threads, inter_op_threads)
+    with _onnx_sessions_lock:
+        session = _onnx_sessions.get(key)
+        if session is None:
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = intra_op_threads
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session = onnxruntime.InferenceSession(key[0], sess_options=options, providers=["CPUExecutionProvider"])
+            _onnx_sessions[key] = session
+            logger.info(f"Loaded ONNX VAD model {key[0]} (intra_op: {intra_op_threads}, inter_op: {inter_op_threads})")
+        return session
+
+
+class AudioReframer:
+    """Re-chunks incoming frames into exact `frame_size` hops
+    
+    Frames of any size, channel count and sample rate go in; complete hops at
+    the VAD sample rate come out, each with its absolute sample offset in the
+    stream. Samples that do not fill a hop are kept for the next call. Other
+    input rates go through a band-limited StreamingResampler that carries its
+    filter state and phase across frames, so offsets stay sample-accurate.
+    """
+    
+    def __init__(self, frame_size: int, sample_rate: int):
+        self.frame_size = frame_size
+        self.sample_rate = sample_rate
+        self.leftover = np.zeros(0, dtype=np.int16)  # at the VAD sample rate
+        self.resampler: Optional[StreamingResampler] = None  # for the current input rate
+        self.next_offset = 0  # absolute position of the first leftover sample
+        
+    def reset(self) -> None:
+        """Drop buffered samples and restart the sample clock"""
+        self.leftover = np.zeros(0, dtype=np.int16)
+        self.resampler = None
+        self.next_offset = 0
+        
+    def _to_target_rate(self, audio: np.ndarray, input_rate: int) -> np.ndarray:
+        """Resample to the VAD rate, low-passed and continuous across frames"""
+        if input_rate == self.sample_rate:
+            return audio
+            
+        if self.resampler is None or self.resampler.source_rate != input_rate:
+            self.resampler = StreamingResampler(input_rate, self.sample_rate)
+        resampled = self.resampler.process(audio)
+        return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+        
+    def push(self, audio: np.ndarray, input_rate: Optional[int] = None, channels: int = 1) -> tuple:
+        """Add a frame, returns (offsets, hops) for every complete hop"""
+        if channels > 1:
+            audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1).astype(np.int16)
+            
+        audio = self._to_target_rate(audio, input_rate or self.sample_rate)
+        buffered = np.concatenate((self.leftover, audio)) if len(self.leftover) else audio
+        
+        num_hops = len(buffered) // self.frame_size
+        usable = num_hops * self.frame_size
+        hops = buffered[:usable].reshape(num_hops, self.frame_size)
+        offsets = self.next_offset + np.arange(num_hops, dtype=np.int64) * self.frame_size
+        
+        self.leftover = buffered[usable:].copy()
+        self.next_offset += usable
+        return offsets, hops
+
+
+class VADStateMachine:
+    """Hysteresis between raw hop decisions and the reported speech state
+    
+    All durations come from absolute sample positions, so results do not
+    depend on wall-clock time or scheduling jitter.
+    """
+    
+    def __init__(self, sample_rate: int = 16000, min_silence_duration: float = 0.3,
+                 min_speech_duration: float = 0.1):
+        self.sample_rate = sample_rate
+        self.min_silence_duration = min_silence_duration
+        self.min_speech_duration = min_speech_duration
+        self.reset()
+        
+    def reset(self) -> None:
+        self.current_state = False  # False = silence, True = speech
+        self.state_start_sample = 0
+        self.transition_sample = 0  # where the run that caused the last flip began
+        
+    def update(self, is_speech: bool, sample_index: int) -> bool:
+        """Advance by one hop ending at `sample_index`, returns True on a state change"""
+        if is_speech == self.current_state:
+            # State hasn't changed, update start position
+            self.state_start_sample = sample_index
+            return False
+            
+        state_duration = (sample_index - self.state_start_sample) / self.sample_rate
+        
+        # Check minimum duration requirements
+        if self.current_state and state_duration >= self.min_speech_duration:
+            # Was speech, now silence - require minimum speech duration
+            self.current_state = False
+        elif not self.current_state and state_duration >= self.min_silence_duration:
+            # Was silence, now speech - require minimum silence duration
+            self.current_state = True
+        else:
+            return False
+            
+        self.transition_sample = self.state_start_sample
+        self.state_start_sample = sample_index
+        return True
+
+
+class MultiStreamVAD:
+    """One VAD engine and state machine for many concurrent streams
+    
+    Streams push frames as they arrive; every `tick` scores the complete hops
+    of all streams in a single vectorized engine call and advances the
+    hysteresis of all streams together. The per-stream state lives in flat
+    numpy arrays indexed by slot, so the Python overhead of a tick grows with
+    the number of hops per stream, not with the number of streams.
+    
+    Event semantics match VADStateMachine: a stream reports speech_start or
+    speech_end at the end of the hop that flipped its state.
+    """
+    
+    def __init__(self, threshold: float = 0.5, sample_rate: int = 16000, frame_size: int = 160,
+                 min_silence_duration: float = 0.3, min_speech_duration: float = 0.1,
+                 tick_interval: float = 0.02, engine: str = "auto", model_path: str = "",
+                 intra_op_threads: int = 1, inter_op_threads: int = 1):
+        self.sample_rate = sample_rate
+        self.min_silence_samples = min_silence_duration * sample_rate
+        self.min_speech_samples = min_speech_duration * sample_rate
+        self.tick_interval = tick_interval
+        self._engine_args = (threshold, sample_rate, frame_size, engine, model_path,
+                             intra_op_threads, inter_op_threads)
+        self.vad_engine = create_vad_engine(*self._engine_args)
+        self.frame_size = getattr(self.vad_engine, "frame_size", frame_size)
+        
+        # Recurrent engines batch one step across streams with per-slot state below;
+        # native engines keep hidden state of their own, so each stream gets its own
+        self.recurrent = getattr(self.vad_engine, "recurrent", False)
+        self.batched = hasattr(self.vad_engine, "process_hops") and not self.recurrent
+        self.stream_engines: Dict[int, object] = {}
+        
+        # Per-slot state, grown by doubling
+        capacity = 8
+        if self.recurrent:
+            self.rnn_state, self.rnn_context = self.vad_engine.initial_state(capacity)
+        self.current_state = np.zeros(capacity, dtype=bool)
+        self.state_start_sample = np.zeros(capacity, dtype=np.int64)
+        self.transition_sample = np.zeros(capacity, dtype=np.int64)
+        self.reframers: List[Optional[AudioReframer]] = [None] * capacity
+        self.pending: List[list] = [[] for _ in range(capacity)]
+        
+        self.slots: Dict[Hashable, int] = {}
+        self.stream_ids: List[Optional[Hashable]] = [None] * capacity
+        self.callbacks: Dict[Hashable, Callable] = {}
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        
+        self.lock = threading.Lock()
+        self.ticker_thread: Optional[threading.Thread] = None
+        self.ticker_stop = threading.Event()
+        self.sessions = 0  # holders from get_shared_vad, guarded by _shared_engines_lock
+        
+        # Statistics
+        self.ticks = 0
+        self.hops_scored = 0
+        
+    def _grow(self) -> None:
+        """Double the slot capacity, caller holds the lock"""
+        old = len(self.current_state)
+        self.current_state = np.concatenate((self.current_state, np.zeros(old, dtype=bool)))
+        self.state_start_sample = np.concatenate((self.state_start_sample, np.zeros(old, dtype=np.int64)))
+        self.transition_sample = np.concatenate((self.transition_sample, np.zeros(old, dtype=np.int64)))
+        self.reframers.extend([None] * old)
+        self.pending.extend([] for _ in range(old))
+        self.stream_ids.extend([None] * old)
+        self.free_slots.extend(range(2 * old - 1, old - 1, -1))
+        if self.recurrent:
+            state, context = self.vad_engine.initial_state(old)
+            self.rnn_state = np.concatenate((self.rnn_state, state), axis=1)
+            self.rnn_context = np.concatenate((self.rnn_context, context))
+        
+    def add_stream(self, stream_id: Hashable, callback: Optional[Callable] = None) -> None:
+        """Register a stream, `callback(stream_id, event, sample_index, confidence)` gets its events"""
+        with self.lock:
+            if stream_id in self.slots:
+                return
+            if not self.free_slots:
+                self._grow()
+                
+            slot = self.free_slots.pop()
+            self.slots[stream_id] = slot
+            self.stream_ids[slot] = stream_id
+            self.reframers[slot] = AudioReframer(self.frame_size, self.sample_rate)
+            self._reset_slot(slot)
+            if callback:
+                self.callbacks[stream_id] = callback
+            if not self.batched and not self.recurrent:
+                self.stream_engines[slot] = create_vad_engine(*self._engine_args)
+                
+    def remove_stream(self, stream_id: Hashable) -> None:
+        """Unregister a stream and free its slot"""
+        with self.lock:
+            slot = self.slots.pop(stream_id, None)
+            if slot is None:
+                return
+                
+            self.stream_ids[slot] = None
+            self.reframers[slot] = None
+            self.pending[slot] = []
+            self.callbacks.pop(stream_id, None)
+            self.stream_engines.pop(slot, None)
+            self.free_slots.append(slot)
+            
+    def reset_stream(self, stream_id: Hashable) -> None:
+        """Restart a stream's sample clock and state"""
+        with self.lock:
+            slot = self.slots.get(stream_id)
+            if slot is not None:
+                self.reframers[slot].reset()
+                self.pending[slot] = []
+                self._reset_slot(slot)
+                
+    def _reset_slot(self, slot: int) -> None:
+        self.current_state[slot] = False
+        self.state_start_sample[slot] = 0
+        self.transition_sample[slot] = 0
+        if self.recurrent:
+            self.rnn_state[:, slot] = 0.0
+            self.rnn_context[slot] = 0.0
+            
+    def is_speech(self, stream_id: Hashable) -> bool:
+        """Current reported state of a stream"""
+        slot = self.slots.get(stream_id)
+        return bool(self.current_state[slot]) if slot is not None else False
+        
+    def push(self, stream_id: Hashable, audio: np.ndarray, input_rate: Optional[int] = None,
+             channels: int = 1) -> None:
+        """Queue a frame for the next tick"""
+        with self.lock:
+            slot = self.slots.get(stream_id)
+            if slot is None:
+                return
+                
+            offsets, hops = self.reframers[slot].push(audio, input_rate, channels)
+            if len(hops):
+                self.pending[slot].append((offsets, hops))
+                
+    def tick(self) -> List[Tuple[Hashable, str, int, float]]:
+        """Score every pending hop of every stream, returns (stream_id, event, sample_index, confidence)"""
+        with self.lock:
+            slots = [slot for slot in self.slots.values() if self.pending[slot]]
+            if not slots:
+                return []
+                
+            offsets_parts = []
+            hops_parts = []
+            counts = np.zeros(len(slots), dtype=np.int64)
+            for i, slot in enumerate(slots):
+                for offsets, hops in self.pending[slot]:
+                    offsets_parts.append(offsets)
+                    hops_parts.append(hops)
+                    counts[i] += len(hops)
+                self.pending[slot] = []
+                
+            all_hops = np.concatenate(hops_parts)
+            hop_ends = np.concatenate(offsets_parts) + self.frame_size
+            
+            # One engine call for all streams
+            if self.recurrent:
+                hop_speech, hop_confidence = self._score_recurrent(np.array(slots), counts, all_hops)
+            elif self.batched:
+                hop_speech, hop_confidence = self.vad_engine.process_hops(all_hops)
+            else:
+                hop_speech = np.zeros(len(all_hops), dtype=bool)
+                hop_confidence = np.zeros(len(all_hops), dtype=np.float32)
+                start = 0
+                for slot, count in zip(slots, counts):
+                    hop_speech[start:start + count], hop_confidence[start:start + count] = score_hops(
+                        self.stream_engines[slot], all_hops[start:start + count]
+                    )
+                    start += count
+                    
+            events = self._advance(np.array(slots), counts, hop_speech, hop_confidence, hop_ends)
+            self.ticks += 1
+            self.hops_scored += len(all_hops)
+            callbacks = [(self.callbacks.get(event[0]), event) for event in events]
+            
+        for callback, event in callbacks:
+            if callback:
+                try:
+                    callback(*event)
+                except Exception as e:
+                    logger.error(f"Error in VAD event callback for {event[0]}: {e}")
+                    
+        return events
+        
+    def _score_recurrent(self, slots: np.ndarray, counts: np.ndarray, all_hops: np.ndarray) -> tuple:
+        """Step a recurrent engine once per hop position, batching every stream that has that hop"""
+        hop_confidence = np.zeros(len(all_hops), dtype=np.float32)
+        starts = np.cumsum(counts) - counts
+        
+        for k in range(int(counts.max())):
+            selected = counts > k
+            slot = slots[selected]
+            index = starts[selected] + k
+            probability, state, context = self.vad_engine.infer(
+                all_hops[index], self.rnn_state[:, slot], self.rnn_context[slot]
+            )
+            hop_confidence[index] = probability
+            self.rnn_state[:, slot] = state
+            self.rnn_context[slot] = context
+            
+        return hop_confidence > self.vad_engine.threshold, hop_confidence
+        
+    def _advance(self, slots: np.ndarray, counts: np.ndarray, hop_speech: np.ndarray,
+                 hop_confidence: np.ndarray, hop_ends: np.ndarray) -> list:
+        """Run the hysteresis of all streams in lockstep, one hop position at a time"""
+        events = []
+        starts = np.cumsum(counts) - counts
+        
+        for k in range(int(counts.max())):
+            selected = counts > k
+            slot = slots[selected]
+            index = starts[selected] + k
+            is_speech = hop_speech[index]
+            sample_index = hop_ends[index]
+            current = self.current_state[slot]
+            
+            # Same state, the run restarts at this hop
+            same = is_speech == current
+            self.state_start_sample[slot[same]] = sample_index[same]
+            
+            duration = sample_index - self.state_start_sample[slot]
+            to_silence = ~same & current & (duration >= self.min_speech_samples)
+            to_speech = ~same & ~current & (duration >= self.min_silence_samples)
+            flipped = to_silence | to_speech
+            if not flipped.any():
+                continue
+                
+            flipped_slots = slot[flipped]
+            self.transition_sample[flipped_slots] = self.state_start_sample[flipped_slots]
+            self.state_start_sample[flipped_slots] = sample_index[flipped]
+            self.current_state[flipped_slots] = ~current[flipped]
+            
+            for flipped_slot, hop_index, speech in zip(flipped_slots, index[flipped], to_speech[flipped]):
+                events.append((
+                    self.stream_ids[flipped_slot],
+                    "speech_start" if speech else "speech_end",
+                    int(hop_ends[hop_index]),
+                    float(hop_confidence[hop_index]),
+                ))
+                
+        return events
+        
+    def start(self) -> None:
+        """Tick every `tick_interval` on a background thread"""
+        with self.lock:
+            if self.ticker_thread and self.ticker_thread.is_alive():
+                return
+            self.ticker_stop.clear()
+            self.ticker_thread = threading.Thread(target=self._ticker_loop, daemon=True)
+            self.ticker_thread.start()
+            
+    def stop(self) -> None:
+        self.ticker_stop.set()
+        if self.ticker_thread and self.ticker_thread is not threading.current_thread():
+            self.ticker_thread.join(timeout=1.0)
+        self.ticker_thread = None
+        
+    def _ticker_loop(self) -> None:
+        while not self.ticker_stop.wait(self.tick_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Error in multi-stream VAD tick: {e}")
+                
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "streams": len(self.slots),
+                "capacity": len(self.current_state),
+                "ticks": self.ticks,
+                "hops_scored": self.hops_scored,
+                "batched": self.batched or self.recurrent,
+            }
+
+
+# Process-wide engines, keyed by their configuration
+_shared_engines: Dict[tuple, MultiStreamVAD] = {}
+_shared_engines_lock = threading.Lock()
+
+
+def get_shared_vad(threshold: float, sample_rate: int, frame_size: int, min_silence_duration: float,
+                   min_speech_duration: float, tick_interval: float, engine: str = "auto",
+                   model_path: str = "", intra_op_threads: int = 1, inter_op_threads: int = 1) -> MultiStreamVAD:
+    """The multi-stream VAD shared by every stream with the same configuration, pair with release_shared_vad()"""
+    key = (threshold, sample_rate, frame_size, min_silence_duration, min_speech_duration, tick_interval,
+           engine, model_path, intra_op_threads, inter_op_threads)
+    with _shared_engines_lock:
+        engine = _shared_engines.get(key)
+        if engine is None:
+            engine = MultiStreamVAD(*key)
+            _shared_engines[key] = engine
+        engine.sessions += 1
+        engine.start()
+        return engine
+
+
+def release_shared_vad(engine: MultiStreamVAD, stream_id: Optional[Hashable] = None) -> None:
+    """Drop one holder (and its stream), the last one stops the engine"""
+    if stream_id is not None:
+        engine.remove_stream(stream_id)
+        
+    with _shared_engines_lock:
+        engine.sessions -= 1
+        if engine.sessions > 0:
+            return
+        # Unregister before stopping so a new session builds a fresh engine
+        for key, shared in list(_shared_engines.items()):
+            if shared is engine:
+                del _shared_engines[key]
+                
+    engine.stop()
+
+
+def create_vad_engine(threshold: float = 0.5, sample_rate: int = 16000, frame_size: int = 160,
+                      engine: str = "auto", model_path: str = "", intra_op_threads: int = 1,
+                      inter_op_threads: int = 1):
+    """Instantiate a VAD engine by name
+    
+    "auto" picks TEN VAD when it is importable and the threshold-based
+    fallback otherwise. "onnx" needs `model_path` and onnxruntime, and fixes
+    the hop size to the model window (see OnnxVAD).
+    """
+    if engine not in VAD_ENGINES:
+        raise ValueError(f"Unknown VAD engine: {engine} (available: {', '.join(VAD_ENGINES)})")
+        
+    if engine == "onnx":
+        if not model_path:
+            raise ValueError("The onnx VAD engine needs a model path")
+        return OnnxVAD(model_path, threshold, sample_rate, intra_op_threads, inter_op_threads)
+        
+    if engine == "ten_vad" and not TEN_VAD_AVAILABLE:
+        raise ImportError("ten_vad is not installed")
+        
+    if engine in ("auto", "ten_vad") and TEN_VAD_AVAILABLE:
+        return ten_vad.TenVAD(
+            sample_rate=sample_rate,
+            frame_size=frame_size
+        )
+    return SimpleVAD(
+        threshold=threshold,
+        sample_rate=sample_rate,
+        frame_size=frame_size
+    )
+
+
+def score_hops(vad_engine, hops: np.ndarray) -> tuple:
+    """Run a VAD engine over all hops, vectorized when the engine supports it"""
+    if hasattr(vad_engine, "process_hops"):
+        return vad_engine.process_hops(hops)
+        
+    # Engines without a batch API score hop by hop
+    results = [vad_engine.process(hop) for hop in hops]
+    is_speech = np.array([result[0] for result in results], dtype=bool)
+    confidence = np.array([result[1] for result in results], dtype=np.float32)
+    return is_speech, confidence
\ No newline at end of file
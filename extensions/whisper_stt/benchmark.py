@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+STT engine benchmark for TEN Agent
+Usage: python benchmark.py --clips <dir> [--engines whisper faster_whisper] [--model base]
+
+The clip directory holds WAV files with a reference transcript next to each
+one (clip.wav + clip.txt). Every engine transcribes every clip once after a
+warm-up decode; the report lists real-time factor (processing time / audio
+duration, lower is faster) and corpus word error rate. All engines decode
+with the same beam size; precisions are set per engine, e.g.
+--compute-type faster_whisper=int8_float32.
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import logging
+
+from stt_engines import ENGINES, create_engine
+from standalone import load_audio, SAMPLE_RATE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_words(text):
+    """Lowercase and strip punctuation before scoring"""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance between two transcripts"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ref_word != hyp_word)  # substitution
+            )
+        previous = current
+        
+    return previous[-1], len(ref)
+
+
+def load_clips(clips_dir):
+    """Load every WAV clip that has a reference transcript"""
+    clips = []
+    for wav_path in sorted(glob.glob(os.path.join(clips_dir, "*.wav"))):
+        ref_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(ref_path):
+            logger.warning(f"No reference transcript for {wav_path}, skipping")
+            continue
+            
+        with open(ref_path, "r", encoding="utf-8") as f:
+            reference = f.read().strip()
+            
+        clips.append((os.path.basename(wav_path), load_audio(wav_path), reference))
+    return clips
+
+
+def parse_compute_types(values):
+    """engine=type pairs to a dict, raises ValueError on anything else"""
+    compute_types = {}
+    for value in values:
+        engine_name, separator, compute_type = value.partition("=")
+        if not separator or engine_name not in ENGINES or not compute_type:
+            raise ValueError(f"Expected ENGINE=TYPE with ENGINE in {', '.join(ENGINES)}, got {value!r}")
+        compute_types[engine_name] = compute_type
+    return compute_types
+
+
+def benchmark_engine(engine_name, clips, model_name, language, threads, compute_type, beam_size=1):
+    """Transcribe all clips with one engine and collect timing and accuracy"""
+    load_start = time.time()
+    engine = create_engine(engine_name, model_name, threads=threads, compute_type=compute_type,
+                           beam_size=beam_size)
+    load_time = time.time() - load_start
+    
+    # Warm-up so one-time allocations do not count against the first clip
+    engine.transcribe(clips[0][1], language=language)
+    
+    total_audio = 0.0
+    total_time = 0.0
+    total_errors = 0
+    total_words = 0
+    per_clip = []
+    
+    for name, audio, reference in clips:
+        start = time.time()
+        text = engine.transcribe(audio, language=language)["text"].strip()
+        elapsed = time.time() - start
+        
+        duration = len(audio) / SAMPLE_RATE
+        errors, words = word_errors(reference, text)
+        total_audio += duration
+        total_time += elapsed
+        total_errors += errors
+        total_words += words
+        
+        per_clip.append({
+            "clip": name,
+            "rtf": round(elapsed / duration, 4) if duration else None,
+            "wer": round(errors / words, 4) if words else None,
+            "text": text,
+        })
+        
+    return {
+        "engine": engine_name,
+        "compute_type": engine.compute_type,
+        "beam_size": engine.beam_size,
+        "load_time": round(load_time, 2),
+        "audio_seconds": round(total_audio, 2),
+        "processing_seconds": round(total_time, 2),
+        "rtf": round(total_time / total_audio, 4) if total_audio else None,
+        "wer": round(total_errors / total_words, 4) if total_words else None,
+        "clips": per_clip,
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare STT engines on a local clip set")
+    parser.add_argument("--clips", required=True, help="Directory with clip.wav + clip.txt pairs")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--model", default="base", help="Model name passed to every engine")
+    parser.add_argument("--language", default="en", help="Transcription language")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per engine (0 = engine default)")
+    parser.add_argument("--compute-type", nargs="+", default=[], metavar="ENGINE=TYPE",
+                        help="Override an engine's default precision, e.g. faster_whisper=int8_float32")
+    parser.add_argument("--beam-size", type=int, default=1, help="Beam search width for every engine (1 = greedy)")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    
+    try:
+        compute_types = parse_compute_types(args.compute_type)
+    except ValueError as e:
+        parser.error(str(e))
+        
+    clips = load_clips(args.clips)
+    if not clips:
+        print(f"No clips with reference transcripts found in {args.clips}", file=sys.stderr)
+        sys.exit(1)
+        
+    results = []
+    for engine_name in args.engines:
+        try:
+            results.append(benchmark_engine(
+                engine_name, clips, args.model, args.language, args.threads,
+                compute_types.get(engine_name, ""), args.beam_size
+            ))
+        except (ImportError, ValueError) as e:
+            logger.warning(f"Skipping {engine_name}: {e}")
+            
+    if not results:
+        sys.exit(1)
+        
+    baseline_rtf = results[0]["rtf"]
+    print(f"\n{len(clips)} clip(s), model {args.model}, beam size {args.beam_size}")
+    print(f"{'engine':<16}{'compute':<10}{'load s':>8}{'RTF':>10}{'speedup':>9}{'WER':>8}")
+    for result in results:
+        speedup = baseline_rtf / result["rtf"] if baseline_rtf and result["rtf"] else 0.0
+        print(f"{result['engine']:<16}{result['compute_type']:<10}{result['load_time']:>8.2f}"
+              f"{result['rtf'] or 0.0:>10.4f}{speedup:>8.2f}x{result['wer'] or 0.0:>8.3f}")
+        
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -11,28 +11,376 @@ from ten import (
     CmdResult,
     StatusCode,
 )
-import whisper
 import numpy as np
 import threading
 import queue
 import time
+import json
 import logging
+import sys
+import os
+from collections import deque
+from dataclasses import dataclass
 from typing import Optional
 
+# Engines live next to this file so standalone.py and benchmark.py can share them
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../common'))
+from stt_engines import ENGINES, create_engine
+from model_registry import model_registry
+from model_loader import ModelLoader
+
 logger = logging.getLogger(__name__)
 
 
+class AudioRingBuffer:
+    """Fixed-capacity int16 circular buffer for PCM audio
+    
+    Samples are stored twice (at i and i + capacity) so that any window of up
+    to `capacity` samples is a contiguous slice and can be returned as a view.
+    When full, the oldest samples are overwritten and counted as dropped.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._storage = np.zeros(self.capacity * 2, dtype=np.int16)
+        self._start = 0  # index of the oldest sample, always < capacity
+        self._size = 0
+        self.total_written = 0
+        self.overflow_count = 0
+        self.dropped_samples = 0
+        
+    def __len__(self) -> int:
+        return self._size
+        
+    @property
+    def start_index(self) -> int:
+        """Absolute stream position of the oldest buffered sample"""
+        return self.total_written - self._size
+        
+    def write(self, samples: np.ndarray) -> int:
+        """Append int16 samples, returns the number of old samples dropped"""
+        count = len(samples)
+        if count == 0:
+            return 0
+            
+        # Only the newest `capacity` samples can ever be kept
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+            
+        dropped = max(0, self._size + count - self.capacity)
+        if dropped:
+            self._start = (self._start + dropped) % self.capacity
+            self._size -= min(dropped, self._size)
+            self.overflow_count += 1
+            self.dropped_samples += dropped
+            
+        kept = len(samples)
+        end = (self._start + self._size) % self.capacity
+        first = min(kept, self.capacity - end)
+        self._storage[end:end + first] = samples[:first]
+        self._storage[end + self.capacity:end + self.capacity + first] = samples[:first]
+        if first < kept:
+            rest = kept - first
+            self._storage[:rest] = samples[first:]
+            self._storage[self.capacity:self.capacity + rest] = samples[first:]
+            
+        self._size = min(self._size + kept, self.capacity)
+        self.total_written += count
+        return dropped
+        
+    def view(self, num_samples: Optional[int] = None, offset: int = 0) -> np.ndarray:
+        """Zero-copy int16 view of `num_samples` samples starting `offset` after the oldest"""
+        available = max(0, self._size - offset)
+        if num_samples is None or num_samples > available:
+            num_samples = available
+        begin = self._start + offset
+        return self._storage[begin:begin + num_samples]
+        
+    def read_float32(self, num_samples: Optional[int] = None, offset: int = 0) -> np.ndarray:
+        """Convert a window to normalized float32 in a single pass"""
+        window = self.view(num_samples, offset)
+        out = np.empty(len(window), dtype=np.float32)
+        np.multiply(window, 1.0 / 32768.0, out=out, casting="unsafe")
+        return out
+        
+    def consume(self, num_samples: int) -> None:
+        """Discard the oldest `num_samples` samples"""
+        num_samples = max(0, min(num_samples, self._size))
+        self._start = (self._start + num_samples) % self.capacity
+        self._size -= num_samples
+        
+    def clear(self) -> None:
+        """Drop all buffered samples (counters are kept)"""
+        self._start = 0
+        self._size = 0
+        
+    def stats(self) -> dict:
+        """Buffer occupancy and overflow counters"""
+        return {
+            "capacity": self.capacity,
+            "size": self._size,
+            "total_written": self.total_written,
+            "overflow_count": self.overflow_count,
+            "dropped_samples": self.dropped_samples,
+        }
+
+
+@dataclass
+class TranscriptionJob:
+    """A window of audio waiting for the transcription worker"""
+    audio: np.ndarray
+    enqueued_at: float
+    start_index: int = 0  # absolute stream position of the first sample
+
+
+class TranscriptionJobQueue:
+    """Bounded job queue between on_data and the transcription worker
+    
+    Backpressure policies when the queue is full:
+      drop_oldest - discard the oldest queued window
+      merge       - append the new audio to the newest queued window when it
+                    continues it, otherwise drop_oldest
+      block       - wait for the worker to free a slot
+    """
+    
+    POLICIES = ("drop_oldest", "merge", "block")
+    
+    def __init__(self, max_size: int = 4, policy: str = "drop_oldest"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.max_size = max(1, max_size)
+        self.policy = policy
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.merged = 0
+        self.max_depth = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        
+    def put(self, job: TranscriptionJob, timeout: float = 1.0) -> bool:
+        """Enqueue a job applying the backpressure policy, returns False if it was rejected"""
+        with self._cond:
+            while len(self._jobs) >= self.max_size and not self._closed:
+                newest = self._jobs[-1]
+                if self.policy == "merge" and newest.start_index + len(newest.audio) == job.start_index:
+                    newest.audio = np.concatenate((newest.audio, job.audio))
+                    self.merged += 1
+                    self.enqueued += 1
+                    return True
+                elif self.policy != "block":
+                    # drop_oldest, or merge across a gap (VAD segments) that one
+                    # job's start_index could not describe
+                    self._jobs.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait(timeout):
+                    self.dropped += 1
+                    return False
+                    
+            if self._closed:
+                return False
+                
+            self._jobs.append(job)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._jobs))
+            self._cond.notify_all()
+            return True
+            
+    def get(self, timeout: float = 1.0) -> Optional[TranscriptionJob]:
+        """Dequeue the oldest job, or None after `timeout` seconds"""
+        with self._cond:
+            if not self._jobs and not self._closed:
+                self._cond.wait(timeout)
+            if not self._jobs:
+                return None
+                
+            job = self._jobs.popleft()
+            self._cond.notify_all()
+            
+        wait_time = time.time() - job.enqueued_at
+        self.processed += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        return job
+        
+    def clear(self) -> None:
+        """Drop all pending jobs"""
+        with self._cond:
+            self.dropped += len(self._jobs)
+            self._jobs.clear()
+            self._cond.notify_all()
+            
+    def close(self) -> None:
+        """Wake up any waiting producer or consumer"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            
+    def __len__(self) -> int:
+        return len(self._jobs)
+        
+    def stats(self) -> dict:
+        """Queue depth and wait time metrics"""
+        return {
+            "policy": self.policy,
+            "depth": len(self._jobs),
+            "max_size": self.max_size,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "avg_wait_ms": (self.total_wait_time / self.processed * 1000) if self.processed else 0.0,
+            "max_wait_ms": self.max_wait_time * 1000,
+        }
+
+
+class ModelLadder:
+    """Picks a model size per job from queue depth and observed latency
+    
+    Steps down to the next smaller model when a job misses the latency budget
+    or the backlog reaches `backlog_threshold`, and steps back up after
+    `step_up_after` consecutive jobs finish well inside the budget with an
+    empty queue. Names are ordered from smallest to largest.
+    """
+    
+    def __init__(self, names: list, start_index: int, latency_budget: float,
+                 backlog_threshold: int = 2, step_up_ratio: float = 0.5, step_up_after: int = 3):
+        self.names = names
+        self.index = min(max(start_index, 0), len(names) - 1)
+        self.latency_budget = latency_budget
+        self.backlog_threshold = backlog_threshold
+        self.step_up_ratio = step_up_ratio
+        self.step_up_after = step_up_after
+        self.good_streak = 0
+        self.switches = 0
+        self.jobs = {name: 0 for name in names}
+        self.total_latency = {name: 0.0 for name in names}
+        
+    @property
+    def current(self) -> str:
+        return self.names[self.index]
+        
+    def _switch(self, index: int, reason: str) -> None:
+        logger.info(f"Model ladder: {self.current} -> {self.names[index]} ({reason})")
+        self.index = index
+        self.good_streak = 0
+        self.switches += 1
+        
+    def select(self, queue_depth: int) -> str:
+        """Model for the next job, stepping down early when a backlog builds up"""
+        if queue_depth >= self.backlog_threshold and self.index > 0:
+            self._switch(self.index - 1, f"backlog of {queue_depth}")
+        return self.current
+        
+    def record(self, model_name: str, latency: float, queue_depth: int) -> None:
+        """Account a finished job and adapt the model size"""
+        self.jobs[model_name] += 1
+        self.total_latency[model_name] += latency
+        
+        if latency > self.latency_budget:
+            if self.index > 0:
+                self._switch(self.index - 1, f"latency {latency:.2f}s over budget")
+        elif latency < self.latency_budget * self.step_up_ratio and queue_depth == 0:
+            self.good_streak += 1
+            if self.good_streak >= self.step_up_after and self.index < len(self.names) - 1:
+                self._switch(self.index + 1, "load dropped")
+        else:
+            self.good_streak = 0
+            
+    def stats(self) -> dict:
+        """Current model, switch count and per-model latency"""
+        return {
+            "current": self.current,
+            "switches": self.switches,
+            "latency_budget": self.latency_budget,
+            "models": {
+                name: {
+                    "jobs": self.jobs[name],
+                    "avg_latency_ms": (self.total_latency[name] / self.jobs[name] * 1000) if self.jobs[name] else 0.0,
+                }
+                for name in self.names
+            },
+        }
+
+
+def _normalize_word(word: str) -> str:
+    """Compare hypothesis words without case and punctuation"""
+    return "".join(ch for ch in word.lower() if ch.isalnum())
+
+
+def local_agreement(previous: list, current: list) -> int:
+    """Length of the common word prefix of two consecutive hypotheses"""
+    count = 0
+    for prev_word, cur_word in zip(previous, current):
+        if _normalize_word(prev_word[0]) != _normalize_word(cur_word[0]):
+            break
+        count += 1
+    return count
+
+
 class WhisperSTTExtension(Extension):
     """Whisper Speech-to-Text extension for TEN framework"""
     
     def __init__(self, name: str) -> None:
         super().__init__(name)
-        self.model = None
+        self.models = {}  # model name -> engine
         self.model_name = "base"
+        self.model_ladder: list = []  # smallest to largest, empty = fixed model
+        self.latency_budget = 2.0  # seconds from enqueue to text
+        self.ladder = None
+        self.last_model_name = ""
         self.language = "en"
-        self.audio_buffer = []
+        self.engine = "whisper"
+        self.compute_type = ""  # engine default
+        self.beam_size = 1  # greedy decoding
+        self.threads = 0  # engine default
+        self.workers = 1
+        self.model_idle_ttl = 300.0  # seconds a shared model outlives its last session
+        self.model_keys: list = []
+        
+        # Background loading: start at once, queued windows wait for the warm model
+        self.async_load = False
+        self.warm_up = True
+        self.model_loader: Optional[ModelLoader] = None
         self.buffer_duration = 3.0  # seconds
+        self.max_buffer_duration = 30.0  # seconds of audio kept before dropping
         self.sample_rate = 16000
+        self.audio_buffer = AudioRingBuffer(int(self.max_buffer_duration * self.sample_rate))
+        
+        # Segmentation: "fixed" windows or "vad" driven utterances
+        self.segmentation = "fixed"
+        # Seconds kept before the speech_start event. The VAD only flips after
+        # min_silence_duration (0.3s) of speech, so this must exceed it to keep
+        # any audio from before the onset; 0.5s matches ten_vad's forward_audio
+        self.pre_roll_duration = 0.5
+        self.min_segment_duration = 0.3  # seconds
+        self.max_segment_duration = 15.0  # seconds before a forced cut
+        self.in_speech = False
+        
+        # Streaming partials with local-agreement commit
+        self.streaming = False
+        self.streaming_interval = 0.5  # seconds of new audio between decodes
+        self.stream_event = threading.Event()
+        self.samples_since_decode = 0
+        self.commit_index = 0  # absolute sample position of the last committed word
+        self.committed_words: list = []  # words of the current utterance
+        self.context_words: list = []  # recent committed words, prompt for the next decode
+        self.segment_generation = 0  # bumped on every cut, stale stream steps are dropped
+        self.hypothesis: list = []  # uncommitted (word, start, end) tail
+        self.stream_decodes = 0
+        self.stream_commits = 0
+        
+        self.max_queue_size = 4
+        self.backpressure = "drop_oldest"
+        self.job_queue = TranscriptionJobQueue(self.max_queue_size, self.backpressure)
+        self.ten_env = None
         self.processing_thread = None
         self.running = False
         self.lock = threading.Lock()
@@ -45,8 +393,62 @@ class WhisperSTTExtension(Extension):
             # Get configuration from property.json
             self.model_name = ten_env.get_property_string("model") or "base"
             self.language = ten_env.get_property_string("language") or "en"
+            self.engine = ten_env.get_property_string("engine") or "whisper"
+            self.compute_type = ten_env.get_property_string("compute_type") or ""
+            self.beam_size = ten_env.get_property_int("beam_size") or 1
+            self.threads = ten_env.get_property_int("threads") or 0
+            self.workers = ten_env.get_property_int("workers") or 1
+            idle_ttl = ten_env.get_property_float("model_idle_ttl")
+            self.model_idle_ttl = 300.0 if idle_ttl is None else idle_ttl
+            self.async_load = ten_env.get_property_bool("async_load") or False
+            warm_up = ten_env.get_property_bool("warm_up")
+            self.warm_up = True if warm_up is None else warm_up
+            if self.engine not in ENGINES:
+                logger.warning(f"Unknown STT engine {self.engine}, using whisper")
+                self.engine = "whisper"
+            if self.compute_type and self.compute_type not in ENGINES[self.engine].compute_types:
+                logger.warning(f"{self.engine} does not support compute type {self.compute_type}, "
+                               f"using {ENGINES[self.engine].compute_types[0]}")
+                self.compute_type = ""
+                
+            # Optional ladder of model sizes, e.g. "tiny,base,small"
+            ladder = ten_env.get_property_string("model_ladder") or ""
+            self.model_ladder = [name.strip() for name in ladder.split(",") if name.strip()]
+            self.latency_budget = ten_env.get_property_float("latency_budget") or 2.0
+            self.buffer_duration = ten_env.get_property_float("buffer_duration") or 3.0
+            self.max_buffer_duration = ten_env.get_property_float("max_buffer_duration") or 30.0
+            
+            # Segmentation mode
+            self.segmentation = ten_env.get_property_string("segmentation") or "fixed"
+            self.pre_roll_duration = ten_env.get_property_float("pre_roll_duration") or 0.5
+            self.min_segment_duration = ten_env.get_property_float("min_segment_duration") or 0.3
+            self.max_segment_duration = ten_env.get_property_float("max_segment_duration") or 15.0
+            if self.segmentation not in ("fixed", "vad"):
+                logger.warning(f"Unknown segmentation mode {self.segmentation}, using fixed")
+                self.segmentation = "fixed"
+                
+            # Streaming partial transcripts
+            self.streaming = ten_env.get_property_bool("streaming") or False
+            self.streaming_interval = ten_env.get_property_float("streaming_interval") or 0.5
+            
+            # Never let the ring be smaller than one transcription window or segment
+            capacity_seconds = max(
+                self.max_buffer_duration,
+                self.buffer_duration,
+                self.max_segment_duration + self.pre_roll_duration
+            )
+            self.audio_buffer = AudioRingBuffer(int(capacity_seconds * self.sample_rate))
             
-            logger.info(f"Configured with model: {self.model_name}, language: {self.language}")
+            # Transcription queue between on_data and the worker thread
+            self.max_queue_size = ten_env.get_property_int("max_queue_size") or 4
+            self.backpressure = ten_env.get_property_string("backpressure") or "drop_oldest"
+            if self.backpressure not in TranscriptionJobQueue.POLICIES:
+                logger.warning(f"Unknown backpressure policy {self.backpressure}, using drop_oldest")
+                self.backpressure = "drop_oldest"
+            self.job_queue = TranscriptionJobQueue(self.max_queue_size, self.backpressure)
+            
+            logger.info(f"Configured with model: {self.model_name}, engine: {self.engine}, language: {self.language}")
+            logger.info(f"Segmentation: {self.segmentation}, streaming: {self.streaming}")
             ten_env.on_configure_done()
             
         except Exception as e:
@@ -58,32 +460,96 @@ class WhisperSTTExtension(Extension):
         logger.info("Whisper STT: on_start")
         
         try:
-            # Load Whisper model
-            logger.info(f"Loading Whisper model: {self.model_name}")
-            self.model = whisper.load_model(self.model_name)
-            logger.info("Whisper model loaded successfully")
+            # Start from the configured model, or the largest rung
+            names = self.model_ladder or [self.model_name]
+            start_index = names.index(self.model_name) if self.model_name in names else len(names) - 1
+            self.ladder = ModelLadder(names, start_index, self.latency_budget)
+            
+            self.model_loader = ModelLoader(
+                "Whisper STT",
+                lambda: self._acquire_models(names),
+                self._warm_up_models if self.warm_up else None
+            )
             
-            # Start processing thread
+            # Start transcription worker, it holds queued windows until the models are ready
+            self.ten_env = ten_env
             self.running = True
             self.processing_thread = threading.Thread(target=self._processing_loop)
             self.processing_thread.start()
             
+            if self.async_load:
+                logger.info(f"Loading Whisper model(s) in the background: {', '.join(names)}")
+                self.model_loader.start()
+            elif not self.model_loader.run():
+                raise RuntimeError(self.model_loader.error)
+                
             ten_env.on_start_done()
             
         except Exception as e:
             logger.error(f"Failed to start: {e}")
             ten_env.on_start_done()
             
+    def _acquire_models(self, names: list) -> None:
+        """Acquire Whisper model(s), shared with other sessions in this process"""
+        models = {}
+        for name in names:
+            logger.info(f"Loading Whisper model: {name} ({self.engine})")
+            key = ("stt", name, self.engine, self.compute_type, self.beam_size)
+            model = model_registry.acquire(
+                key,
+                lambda name=name: create_engine(
+                    self.engine,
+                    name,
+                    threads=self.threads,
+                    workers=self.workers,
+                    compute_type=self.compute_type,
+                    beam_size=self.beam_size
+                ),
+                idle_ttl=self.model_idle_ttl
+            )
+            
+            with self.lock:
+                if not self.running:
+                    # Stopped while loading in the background
+                    model_registry.release(key)
+                    raise RuntimeError("Extension stopped during model load")
+                self.model_keys.append(key)
+            models[name] = model
+            
+        self.models = models
+        logger.info("Whisper model loaded successfully")
+        
+    def _warm_up_models(self) -> None:
+        """Decode a second of low-level noise with every model before real audio arrives"""
+        audio = (np.random.default_rng(0).standard_normal(self.sample_rate) * 0.01).astype(np.float32)
+        for model in self.models.values():
+            model.transcribe(audio, language=self.language)
+            
+    def _models_ready(self) -> bool:
+        return self.model_loader is not None and self.model_loader.ready and bool(self.models)
+        
     def on_stop(self, ten_env: TenEnv) -> None:
         """Stop extension"""
         logger.info("Whisper STT: on_stop")
         
         try:
-            self.running = False
+            with self.lock:
+                self.running = False
+            self.job_queue.close()
             
             if self.processing_thread:
                 self.processing_thread.join(timeout=5)
                 
+            if self.model_loader:
+                # A warm-up in flight still uses the models
+                self.model_loader.join(timeout=5)
+                
+            with self.lock:
+                self.models = {}
+                model_keys, self.model_keys = self.model_keys, []
+            for key in model_keys:
+                model_registry.release(key)
+                
             ten_env.on_stop_done()
             
         except Exception as e:
@@ -97,63 +563,241 @@ class WhisperSTTExtension(Extension):
                 # Get audio frame
                 audio_frame = AudioFrame.from_data(data)
                 
-                # Convert to numpy array
+                # View the frame as int16, conversion happens once per window
                 audio_data = np.frombuffer(audio_frame.get_data(), dtype=np.int16)
-                audio_data = audio_data.astype(np.float32) / 32768.0  # Normalize
                 
                 # Add to buffer
                 with self.lock:
-                    self.audio_buffer.extend(audio_data)
+                    dropped = self.audio_buffer.write(audio_data)
+                    
+                    # Outside speech only the pre-roll is worth keeping
+                    if self.segmentation == "vad" and not self.in_speech:
+                        pre_roll = int(self.pre_roll_duration * self.sample_rate)
+                        self.audio_buffer.consume(len(self.audio_buffer) - pre_roll)
+                        
+                    buffer_length = len(self.audio_buffer) / self.sample_rate
+                    
+                if dropped:
+                    logger.warning(f"Audio buffer overflow, dropped {dropped} samples")
                     
+                if self.streaming:
+                    self._schedule_stream_step(ten_env, len(audio_data), buffer_length)
+                    
+                elif self.segmentation == "vad":
+                    # Force a cut during long monologues
+                    if self.in_speech and buffer_length >= self.max_segment_duration:
+                        logger.info("Maximum segment length reached, forcing a cut")
+                        self._process_audio(ten_env, self.min_segment_duration)
+                        
                 # Check if we have enough audio
-                buffer_length = len(self.audio_buffer) / self.sample_rate
-                if buffer_length >= self.buffer_duration:
+                elif buffer_length >= self.buffer_duration:
                     self._process_audio(ten_env)
                     
+            elif data.get_name() == "vad_result":
+                self._handle_vad_result(ten_env, data.get_property_bool("is_speech"))
+                
         except Exception as e:
             logger.error(f"Error handling audio data: {e}")
             
-    def _process_audio(self, ten_env: TenEnv) -> None:
-        """Process audio buffer with Whisper"""
+    def _handle_vad_result(self, ten_env: TenEnv, is_speech: bool) -> None:
+        """Open a segment at speech onset and transcribe it at speech end"""
+        if self.segmentation != "vad":
+            return
+            
+        with self.lock:
+            was_speech = self.in_speech
+            self.in_speech = is_speech
+            
+        if is_speech and not was_speech:
+            logger.debug("Speech onset, segment opened")
+        elif was_speech and not is_speech:
+            logger.debug("Speech ended, segment closed")
+            self._process_audio(ten_env, self.min_segment_duration)
+            
+    def _schedule_stream_step(self, ten_env: TenEnv, num_samples: int, buffer_length: float) -> None:
+        """Wake the worker for a re-decode every `streaming_interval` of new audio"""
+        if self.segmentation == "vad" and not self.in_speech:
+            return
+            
+        # Nothing has been committed for too long, finalize what we have
+        if buffer_length >= self.max_segment_duration:
+            logger.info("Maximum segment length reached, forcing a cut")
+            self._process_audio(ten_env, self.min_segment_duration)
+            return
+            
+        self.samples_since_decode += num_samples
+        if self.samples_since_decode >= self.streaming_interval * self.sample_rate:
+            self.samples_since_decode = 0
+            self.stream_event.set()
+            
+    def _process_audio(self, ten_env: TenEnv, min_duration: float = 1.0) -> None:
+        """Hand the buffered window to the transcription worker"""
         try:
             with self.lock:
-                if len(self.audio_buffer) < self.sample_rate:  # At least 1 second
+                if len(self.audio_buffer) < min_duration * self.sample_rate:
                     return
                     
                 # Get audio data
-                audio_data = np.array(self.audio_buffer, dtype=np.float32)
+                start_index = self.audio_buffer.start_index
+                audio_data = self.audio_buffer.read_float32()
                 self.audio_buffer.clear()
+                self.samples_since_decode = 0
+                self.segment_generation += 1
+                self.stream_event.clear()
                 
-            # Transcribe with Whisper
-            if self.model:
-                result = self.model.transcribe(
-                    audio_data,
-                    language=self.language,
-                    fp16=False
-                )
-                
-                text = result["text"].strip()
+            if not self.job_queue.put(TranscriptionJob(audio_data, time.time(), start_index)):
+                logger.warning("Transcription queue full, window dropped")
                 
-                if text:
-                    logger.info(f"Transcribed: {text}")
-                    
-                    # Create output data
-                    output_data = Data.create("text")
-                    output_data.set_property_string("text", text)
-                    
-                    # Send to next extension
-                    ten_env.send_data(output_data)
-                    
         except Exception as e:
             logger.error(f"Error processing audio: {e}")
             
+    def _transcribe(self, audio: np.ndarray, started_at: float, **options) -> dict:
+        """Run the model picked by the ladder and feed the latency back to it"""
+        # Time spent waiting for the model to load is not decoding latency
+        started_at = max(started_at, self.model_loader.ready_at)
+        model_name = self.ladder.select(len(self.job_queue))
+        result = self.models[model_name].transcribe(audio, language=self.language, **options)
+        
+        self.ladder.record(model_name, time.time() - started_at, len(self.job_queue))
+        self.last_model_name = model_name
+        return result
+        
+    def _transcribe_job(self, ten_env: TenEnv, job: TranscriptionJob) -> None:
+        """Transcribe a queued window with Whisper and send the text"""
+        if not self.models:
+            return
+            
+        result = self._transcribe(job.audio, job.enqueued_at)
+        
+        text = result["text"].strip()
+        
+        if text:
+            logger.info(f"Transcribed: {text}")
+            self._send_text(ten_env, "text", text)
+            
+    def _send_text(self, ten_env: TenEnv, data_name: str, text: str) -> None:
+        """Send a transcript data message to the next extension"""
+        output_data = Data.create(data_name)
+        output_data.set_property_string("text", text)
+        output_data.set_property_string("model", self.last_model_name)
+        ten_env.send_data(output_data)
+        
+    def _decode_words(self, audio: np.ndarray, start_index: int, started_at: Optional[float] = None) -> list:
+        """Decode audio into (word, start, end) tuples on the absolute sample clock
+        
+        Words that end before the commit point were already emitted and are skipped.
+        """
+        if not self.models or len(audio) == 0:
+            return []
+            
+        result = self._transcribe(
+            audio,
+            started_at or time.time(),
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=" ".join(self.context_words) or None
+        )
+        
+        words = []
+        for segment in result.get("segments", []):
+            for word in segment.get("words", []):
+                start = start_index + int(word["start"] * self.sample_rate)
+                end = start_index + int(word["end"] * self.sample_rate)
+                if (start + end) // 2 >= self.commit_index and word["word"].strip():
+                    words.append((word["word"].strip(), start, end))
+        return words
+        
+    def _commit_words(self, ten_env: TenEnv, words: list, generation: Optional[int] = None) -> bool:
+        """Emit newly stable words and trim their audio from the buffer
+        
+        A stream step decoded before a cut (`generation` no longer current) is
+        dropped: its audio now belongs to the queued segment.
+        """
+        with self.lock:
+            if generation is not None and generation != self.segment_generation:
+                return False
+            if not words:
+                return True
+            self.commit_index = words[-1][2]
+            if self.commit_index > self.audio_buffer.start_index:
+                self.audio_buffer.consume(self.commit_index - self.audio_buffer.start_index)
+                
+        new_words = [word for word, _, _ in words]
+        self.context_words = (self.context_words + new_words)[-20:]
+        self.stream_commits += 1
+        
+        text = " ".join(new_words)
+        self._send_text(ten_env, "text_final", text)
+        
+        # Fixed windows have no utterance end, every commit is a transcript of its own
+        if self.segmentation != "vad":
+            logger.info(f"Transcribed: {text}")
+            self._send_text(ten_env, "text", text)
+        else:
+            self.committed_words.extend(new_words)
+        return True
+            
+    def _stream_step(self, ten_env: TenEnv) -> None:
+        """Re-decode the uncommitted window and commit the prefix both hypotheses agree on"""
+        with self.lock:
+            # Between utterances the buffer only holds the silence pre-roll
+            if self.segmentation == "vad" and not self.in_speech:
+                return
+            if len(self.audio_buffer) < self.min_segment_duration * self.sample_rate:
+                return
+            start_index = self.audio_buffer.start_index
+            audio_data = self.audio_buffer.read_float32()
+            generation = self.segment_generation
+            
+        words = self._decode_words(audio_data, start_index)
+        self.stream_decodes += 1
+        
+        stable = local_agreement(self.hypothesis, words)
+        if not self._commit_words(ten_env, words[:stable], generation):
+            logger.debug("Segment cut during decode, stream step dropped")
+            self.hypothesis = []
+            return
+        self.hypothesis = words[stable:]
+        
+        partial = " ".join(self.committed_words + [word for word, _, _ in self.hypothesis])
+        if partial:
+            self._send_text(ten_env, "text_partial", partial)
+            
+    def _finish_stream(self, ten_env: TenEnv, job: TranscriptionJob) -> None:
+        """Commit everything left in a closed segment and end the utterance"""
+        words = self._decode_words(job.audio, job.start_index, job.enqueued_at)
+        self.stream_decodes += 1
+        self._commit_words(ten_env, words)
+        self.commit_index = max(self.commit_index, job.start_index + len(job.audio))
+        
+        if self.segmentation == "vad" and self.committed_words:
+            text = " ".join(self.committed_words)
+            logger.info(f"Transcribed: {text}")
+            self._send_text(ten_env, "text", text)
+            
+        self.committed_words = []
+        self.context_words = []
+        self.hypothesis = []
+        
     def _processing_loop(self) -> None:
-        """Background processing loop"""
+        """Background transcription worker"""
         while self.running:
             try:
-                # Process any remaining audio periodically
-                time.sleep(0.1)
+                if not self._models_ready():
+                    # Windows stay queued (bounded by max_queue_size) until the models are warm
+                    self.model_loader.wait(0.1)
+                    continue
+                    
+                job = self.job_queue.get(timeout=0.05 if self.streaming else 0.5)
                 
+                if job is not None and self.streaming:
+                    self._finish_stream(self.ten_env, job)
+                elif job is not None:
+                    self._transcribe_job(self.ten_env, job)
+                elif self.stream_event.is_set():
+                    self.stream_event.clear()
+                    self._stream_step(self.ten_env)
+                    
             except Exception as e:
                 logger.error(f"Error in processing loop: {e}")
                 
@@ -165,11 +809,36 @@ class WhisperSTTExtension(Extension):
             # Flush audio buffer
             with self.lock:
                 self.audio_buffer.clear()
+                self.in_speech = False
+                self.segment_generation += 1
+                self.stream_event.clear()
+            self.job_queue.clear()
                 
             result = CmdResult.create(StatusCode.OK)
             result.set_property_string("message", "Audio buffer flushed")
             ten_env.return_result(result, cmd)
             
+        elif cmd_name == "get_stats":
+            # Report buffer and queue counters
+            with self.lock:
+                stats = {"audio_buffer": self.audio_buffer.stats()}
+            stats["transcription_queue"] = self.job_queue.stats()
+            stats["model_registry"] = model_registry.stats()
+            if self.model_loader:
+                stats["model"] = self.model_loader.stats()
+            if self.ladder:
+                stats["model_ladder"] = self.ladder.stats()
+            if self.streaming:
+                stats["streaming"] = {
+                    "decodes": self.stream_decodes,
+                    "commits": self.stream_commits,
+                    "pending_words": len(self.hypothesis),
+                }
+            
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("stats", json.dumps(stats))
+            ten_env.return_result(result, cmd)
+            
         else:
             result = CmdResult.create(StatusCode.ERROR)
             result.set_property_string("message", f"Unknown command: {cmd_name}")
@@ -2,18 +2,110 @@
 """
 Standalone Whisper STT script for TEN Agent
 Usage: python standalone.py <audio_file>
+       python standalone.py --serve [--socket PATH] [--workers N]
+       python standalone.py --batch <file|dir|glob>... --output results.jsonl [--workers N]
+
+With --serve the model is loaded once and jobs are accepted as JSON lines
+over a Unix socket. The one-shot form sends its file to a running server
+and only loads a model itself when no server is listening.
+
+With --batch the inputs are sharded across a process pool (one model load
+per worker process). Results are appended to a JSONL file as they finish and
+files whose content hash is already in that file are skipped, so an
+interrupted run can simply be restarted.
 """
 
 import sys
 import os
-import whisper
+import glob
+import json
+import time
+import hashlib
+import wave
+import socket
+import argparse
+import socketserver
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import logging
+import numpy as np
+from stt_engines import ENGINES, create_engine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../common'))
+from resampling import resample
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def transcribe_audio(audio_file_path):
+DEFAULT_MODEL = "base"
+DEFAULT_ENGINE = "whisper"
+DEFAULT_LANGUAGE = "en"
+DEFAULT_SOCKET = os.environ.get("WHISPER_STT_SOCKET", "/tmp/whisper_stt.sock")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+SAMPLE_RATE = 16000
+
+
+def load_model(model_name=DEFAULT_MODEL, engine=DEFAULT_ENGINE, threads=0, workers=1, compute_type="", beam_size=1):
+    """Load an STT engine (backends are imported lazily so the client stays light)"""
+    return create_engine(engine, model_name, threads=threads, workers=workers, compute_type=compute_type,
+                         beam_size=beam_size)
+
+
+def read_wav(audio_file_path):
+    """Decode a PCM WAV file to 16 kHz mono float32 without spawning ffmpeg
+    
+    Raises wave.Error for anything that is not plain integer PCM.
+    """
+    with wave.open(audio_file_path, "rb") as wf:
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+        
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        audio = ((packed << 8) >> 8).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise wave.Error(f"Unsupported sample width: {sample_width}")
+        
+    # Downmix
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+        
+    return resample(audio, sample_rate, SAMPLE_RATE)
+
+
+def load_audio(audio_file_path):
+    """Load audio as 16 kHz mono float32, using ffmpeg only when the file is not PCM WAV"""
+    try:
+        return read_wav(audio_file_path)
+    except (wave.Error, EOFError):
+        pass
+        
+    import whisper
+    
+    return whisper.load_audio(audio_file_path, sr=SAMPLE_RATE)
+
+
+def run_transcription(model, audio, language=DEFAULT_LANGUAGE):
+    """Transcribe a file path or 16 kHz float32 array with an already loaded model"""
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+        
+    result = model.transcribe(audio, language=language)
+    return result["text"].strip()
+
+
+def transcribe_audio(audio_file_path, model_options=None, language=DEFAULT_LANGUAGE):
     """Transcribe audio file using Whisper"""
     try:
         # Check if file exists
@@ -23,19 +115,11 @@ def transcribe_audio(audio_file_path):
             
         # Load Whisper model (using base model for speed)
         logger.info("Loading Whisper model...")
-        model = whisper.load_model("base")
+        model = load_model(**(model_options or {}))
         
         # Transcribe audio
         logger.info(f"Transcribing audio file: {audio_file_path}")
-        result = model.transcribe(
-            audio_file_path,
-            language="en",
-            fp16=False,
-            verbose=False
-        )
-        
-        # Get transcribed text
-        text = result["text"].strip()
+        text = run_transcription(model, audio_file_path, language)
         
         if text:
             print(text)  # Output to stdout for the server to capture
@@ -48,18 +132,311 @@ def transcribe_audio(audio_file_path):
         logger.error(f"Error transcribing audio: {e}")
         return None
 
+
+class TranscriptionHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line"""
+    
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+                
+            response = self.server.handle_job(line)
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class TranscriptionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Long-running transcription daemon with the model loaded once"""
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path, model, language=DEFAULT_LANGUAGE):
+        self.model = model
+        self.language = language
+        super().__init__(socket_path, TranscriptionHandler)
+        
+    def handle_job(self, line):
+        """Run a single job and build its response"""
+        start_time = time.time()
+        response = {"model": self.model.model_name, "engine": self.model.name}
+        
+        try:
+            job = json.loads(line)
+            response["id"] = job.get("id")
+            audio_file_path = job["audio"]
+            
+            if not os.path.exists(audio_file_path):
+                raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+                
+            response["text"] = run_transcription(
+                self.model,
+                audio_file_path,
+                job.get("language") or self.language
+            )
+            
+        except Exception as e:
+            logger.error(f"Error transcribing audio: {e}")
+            response["error"] = str(e)
+            
+        response["duration"] = round(time.time() - start_time, 3)
+        return response
+
+
+def serve(socket_path, language, model_options):
+    """Load the model(s) once and serve jobs until interrupted"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+        
+    # The engine runs up to `workers` jobs in parallel and queues the rest
+    model = load_model(**model_options)
+    server = TranscriptionServer(socket_path, model, language)
+    logger.info(f"Transcription server listening on {socket_path} with {model.workers} worker(s)")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def request_transcription(socket_path, audio_file_path, language=None, timeout=300.0):
+    """Send a job to a running server, returns None when no server is listening
+    
+    A server that drops the connection also returns None so the caller can
+    transcribe in-process; a timeout is reported as an error response instead,
+    since the server is most likely still busy with the job.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        with client:
+            client.connect(socket_path)
+            job = {"id": 1, "audio": os.path.abspath(audio_file_path), "language": language}
+            client.sendall((json.dumps(job) + "\n").encode("utf-8"))
+            
+            with client.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+                
+    except socket.timeout:
+        return {"error": f"No response from the transcription server within {timeout:g}s"}
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except OSError as e:
+        logger.warning(f"Transcription server at {socket_path} failed ({e}), transcribing in-process")
+        return None
+        
+    if not line:
+        logger.warning(f"Transcription server at {socket_path} closed the connection, transcribing in-process")
+        return None
+        
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {"error": f"Invalid response from the transcription server: {line[:200]!r}"}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash used to recognise files that were already transcribed"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def expand_inputs(inputs):
+    """Resolve files, directories and glob patterns to a sorted list of audio files"""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.update(
+                    os.path.join(root, name) for name in names
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        elif os.path.isfile(item):
+            files.add(item)
+        else:
+            files.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def load_done_hashes(output_path):
+    """Hashes of files already present in a previous (possibly partial) run"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+        
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Truncated last line of an interrupted run
+            if "sha256" in record and "error" not in record:
+                done.add(record["sha256"])
+    return done
+
+
+_worker_model = None
+_worker_language = DEFAULT_LANGUAGE
+
+
+def _init_batch_worker(model_options, language):
+    """Process pool initializer, loads the model once per worker"""
+    global _worker_model, _worker_language
+    _worker_model = load_model(**model_options)
+    _worker_language = language
+
+
+def _batch_transcribe(path, sha256):
+    """Transcribe one file inside a pool worker and time it"""
+    record = {"file": path, "sha256": sha256}
+    start_time = time.time()
+    
+    try:
+        audio = load_audio(path)
+        record["audio_duration"] = round(len(audio) / SAMPLE_RATE, 3)
+        record["text"] = run_transcription(_worker_model, audio, _worker_language)
+    except Exception as e:
+        record["error"] = str(e)
+        
+    elapsed = time.time() - start_time
+    record["processing_time"] = round(elapsed, 3)
+    if record.get("audio_duration"):
+        record["rtf"] = round(elapsed / record["audio_duration"], 4)
+    return record
+
+
+def run_batch(inputs, output_path, language, model_options, workers):
+    """Transcribe many files across a process pool, appending JSONL results"""
+    files = expand_inputs(inputs)
+    done = load_done_hashes(output_path)
+    
+    pending = []
+    for path in files:
+        sha256 = file_sha256(path)
+        if sha256 in done:
+            continue
+        done.add(sha256)  # Identical copies in the same run are transcribed once
+        pending.append((path, sha256))
+        
+    logger.info(f"Batch: {len(files)} file(s), {len(files) - len(pending)} already done, {len(pending)} to transcribe")
+    if not pending:
+        return 0
+        
+    # Split the cores between worker processes instead of letting every
+    # backend default to all of them (workers x cores threads in total)
+    worker_options = dict(model_options, workers=1)
+    if not worker_options.get("threads"):
+        worker_options["threads"] = max(1, (os.cpu_count() or 1) // workers)
+        
+    failures = 0
+    batch_start = time.time()
+    total_audio = 0.0
+    
+    with open(output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_batch_worker,
+        initargs=(worker_options, language)
+    ) as pool:
+        futures = {pool.submit(_batch_transcribe, path, sha256): path for path, sha256 in pending}
+        remaining = set(futures.values())
+        
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except BrokenProcessPool as e:
+                # A worker died or its model failed to load; results so far are kept
+                logger.error(f"Worker pool failed ({e or 'a worker process exited'}), "
+                             f"{len(remaining)} file(s) not transcribed, run again to resume:")
+                for path in sorted(remaining):
+                    logger.error(f"  pending: {path}")
+                failures += len(remaining)
+                break
+                
+            remaining.discard(record["file"])
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            
+            if "error" in record:
+                failures += 1
+                logger.error(f"{record['file']}: {record['error']}")
+            else:
+                total_audio += record.get("audio_duration", 0.0)
+                logger.info(f"{record['file']}: rtf {record.get('rtf')}")
+                
+    elapsed = time.time() - batch_start
+    if total_audio:
+        logger.info(f"Batch done in {elapsed:.1f}s, aggregate rtf {elapsed / total_audio:.4f}")
+    return failures
+
+
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
+    parser = argparse.ArgumentParser(description="Standalone Whisper STT for TEN Agent")
+    parser.add_argument("audio_file", nargs="?", help="Audio file to transcribe")
+    parser.add_argument("--serve", action="store_true", help="Run as a long-lived transcription server")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path of the server")
+    parser.add_argument("--batch", nargs="+", metavar="INPUT", help="Files, directories or globs to transcribe")
+    parser.add_argument("--output", default="transcripts.jsonl", help="JSONL results file for --batch")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel jobs (default: 1, or CPU count for --batch)")
+    parser.add_argument("--model", help=f"Whisper model name (default: {DEFAULT_MODEL})")
+    parser.add_argument("--engine", choices=sorted(ENGINES), help=f"STT backend (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--compute-type", default="", help="Engine precision, e.g. int8 for faster_whisper")
+    parser.add_argument("--beam-size", type=int, default=1, help="Beam search width (1 = greedy)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="CPU threads per model (0 = engine default, or CPU count / workers for --batch)")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="Transcription language")
+    args = parser.parse_args()
+    
+    model_options = {
+        "model_name": args.model or DEFAULT_MODEL,
+        "engine": args.engine or DEFAULT_ENGINE,
+        "threads": args.threads,
+        "compute_type": args.compute_type,
+        "beam_size": args.beam_size,
+    }
+    
+    if args.serve:
+        serve(args.socket, args.language, dict(model_options, workers=args.workers or 1))
+        sys.exit(0)
+        
+    if args.batch:
+        failures = run_batch(args.batch, args.output, args.language, model_options, args.workers or os.cpu_count() or 1)
+        sys.exit(1 if failures else 0)
+        
+    if not args.audio_file:
         print("Usage: python standalone.py <audio_file>", file=sys.stderr)
         sys.exit(1)
         
-    audio_file = sys.argv[1]
-    result = transcribe_audio(audio_file)
+    # Prefer a running server, fall back to loading the model in-process
+    response = request_transcription(args.socket, args.audio_file, args.language)
+    if response is not None:
+        # The server keeps the model it was started with
+        for option, requested in (("model", args.model), ("engine", args.engine)):
+            if requested and response.get(option) and response[option] != requested:
+                logger.warning(f"--{option} {requested} ignored, the server at {args.socket} "
+                               f"runs {option} {response[option]}")
+                               
+        text = response.get("text")
+        if text:
+            print(text)
+            sys.exit(0)
+            
+        logger.error(response.get("error") or "No text transcribed from audio")
+        sys.exit(1)
+        
+    result = transcribe_audio(args.audio_file, model_options, args.language)
     
     if result is None:
         sys.exit(1)
-    
+        
     sys.exit(0)
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Speech-to-text engines for the Whisper STT extension and standalone tools
+
+Every engine takes 16 kHz mono float32 audio and returns an openai-whisper
+style result dict: {"text": str, "segments": [{"text", "start", "end", "words"}]}
+so callers do not need to know which backend produced it.
+
+Decoding is greedy (beam_size=1) for every engine unless a beam size is
+given, so engines are compared, and served, with the same search.
+"""
+
+import queue
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class STTEngine:
+    """Base class for speech-to-text backends"""
+    
+    name = ""
+    
+    # Precisions the backend accepts, the first one is the default
+    compute_types: tuple = ()
+    
+    def __init__(self, model_name: str, threads: int = 0, workers: int = 1, compute_type: str = "",
+                 beam_size: int = 1):
+        if compute_type and compute_type not in self.compute_types:
+            raise ValueError(f"{self.name} does not support compute type {compute_type} "
+                             f"(available: {', '.join(self.compute_types)})")
+        self.model_name = model_name
+        self.threads = threads  # 0 = backend default
+        self.workers = max(1, workers)
+        self.compute_type = compute_type or self.compute_types[0]
+        self.beam_size = max(1, beam_size)  # 1 = greedy
+        
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, word_timestamps: bool = False,
+                   initial_prompt: Optional[str] = None, condition_on_previous_text: bool = True) -> dict:
+        raise NotImplementedError
+
+
+class WhisperEngine(STTEngine):
+    """openai-whisper on PyTorch, fp32 on CPU
+    
+    Whisper installs per-call hooks on the model while decoding, so parallel
+    workers each get their own model instance.
+    """
+    
+    name = "whisper"
+    compute_types = ("float32", "float16")
+    
+    def __init__(self, model_name: str, threads: int = 0, workers: int = 1, compute_type: str = "",
+                 beam_size: int = 1):
+        super().__init__(model_name, threads, workers, compute_type, beam_size)
+        import whisper
+        import torch
+        
+        if self.threads:
+            torch.set_num_threads(self.threads)
+            
+        self._fp16 = self.compute_type == "float16" and torch.cuda.is_available()
+        self._models = queue.Queue()
+        for _ in range(self.workers):
+            self._models.put(whisper.load_model(model_name))
+            
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, word_timestamps: bool = False,
+                   initial_prompt: Optional[str] = None, condition_on_previous_text: bool = True) -> dict:
+        model = self._models.get()
+        try:
+            return model.transcribe(
+                audio,
+                language=language,
+                fp16=self._fp16,
+                beam_size=self.beam_size if self.beam_size > 1 else None,
+                verbose=False,
+                word_timestamps=word_timestamps,
+                initial_prompt=initial_prompt,
+                condition_on_previous_text=condition_on_previous_text
+            )
+        finally:
+            self._models.put(model)
+
+
+class FasterWhisperEngine(STTEngine):
+    """faster-whisper on CTranslate2, int8 quantized on CPU by default"""
+    
+    name = "faster_whisper"
+    compute_types = ("int8", "int8_float32", "int16", "float16", "float32")
+    
+    def __init__(self, model_name: str, threads: int = 0, workers: int = 1, compute_type: str = "",
+                 beam_size: int = 1):
+        super().__init__(model_name, threads, workers, compute_type, beam_size)
+        from faster_whisper import WhisperModel
+        
+        self.model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+            num_workers=self.workers
+        )
+        
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, word_timestamps: bool = False,
+                   initial_prompt: Optional[str] = None, condition_on_previous_text: bool = True) -> dict:
+        segments, _ = self.model.transcribe(
+            audio,
+            language=language,
+            beam_size=self.beam_size,
+            word_timestamps=word_timestamps,
+            initial_prompt=initial_prompt,
+            condition_on_previous_text=condition_on_previous_text
+        )
+        
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "text": segment.text,
+                "start": segment.start,
+                "end": segment.end,
+                "words": [
+                    {"word": word.word, "start": word.start, "end": word.end}
+                    for word in (segment.words or [])
+                ],
+            })
+            
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+        }
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+
+def create_engine(engine: str, model_name: str, threads: int = 0, workers: int = 1,
+                  compute_type: str = "", beam_size: int = 1) -> STTEngine:
+    """Instantiate an engine by name"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown STT engine: {engine} (available: {', '.join(ENGINES)})")
+        
+    logger.info(f"Loading {engine} model: {model_name}")
+    return ENGINES[engine](model_name, threads=threads, workers=workers, compute_type=compute_type,
+                           beam_size=beam_size)
\ No newline at end of file